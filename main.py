@@ -6,14 +6,85 @@ Extracts structured outlines (Title + H1/H2/H3) from PDFs
 import sys
 import os
 import time
-import json
+import mmap
+import shutil
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
 
-from src.pdf_parser import PDFParser
+from src.pdf_parser import PDFParser, pdf_digest
 from src.heading_detector import HeadingDetector  
 from src.json_formatter import JSONFormatter
 
+# Per-worker components, created once in each child by _worker_init
+_parser = None
+_detector = None
+_formatter = None
+
+def _worker_init():
+    """Build heavy components once per worker process"""
+    global _parser, _detector, _formatter
+    _parser = PDFParser()
+    _detector = HeadingDetector()
+    _formatter = JSONFormatter()
+
+def _process_one(task: Tuple[str, str]) -> bool:
+    """Worker entry point for a single (input_path, output_path) pair"""
+    input_path, output_path = task
+    return process_single_pdf(input_path, output_path,
+                              _parser, _detector, _formatter)
+
+def _dedupe_tasks(tasks: List[Tuple[str, str]]) -> Tuple[List[Tuple[str, str]], Dict[str, List[str]]]:
+    """
+    Split tasks into unique PDFs to analyze and, per analyzed output path,
+    the output paths of byte-identical copies to fill from it
+    """
+    unique = []
+    copies: Dict[str, List[str]] = {}
+    first_output: Dict[bytes, str] = {}
+    for input_path, output_path in tasks:
+        digest = pdf_digest(input_path)
+        original = first_output.get(digest) if digest is not None else None
+        if original is not None:
+            copies[original].append(output_path)
+            continue
+        if digest is not None:
+            first_output[digest] = output_path
+        copies[output_path] = []
+        unique.append((input_path, output_path))
+    return unique, copies
+
+def _advise(mm: mmap.mmap, advice: Optional[int]):
+    """Best-effort madvise hint; a no-op where the platform lacks it"""
+    if advice is None or not hasattr(mm, 'madvise'):
+        return
+    try:
+        mm.madvise(advice)
+    except (OSError, ValueError):
+        pass
+
+def _map_pdf(input_path: str) -> Optional[mmap.mmap]:
+    """Memory-map a PDF read-only; None if it cannot be mapped (e.g. empty)"""
+    try:
+        with open(input_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    
+    # Each PDF is read front to back once - ask for aggressive readahead
+    _advise(mm, getattr(mmap, 'MADV_SEQUENTIAL', None))
+    return mm
+
+def _unmap_pdf(mm: mmap.mmap):
+    """Release a PDF mapping once parsing is done"""
+    # Drop the mapped pages now rather than letting them count toward RSS
+    # until the next file (MADV_FREE where DONTNEED is missing, e.g. macOS)
+    _advise(mm, getattr(mmap, 'MADV_DONTNEED', getattr(mmap, 'MADV_FREE', None)))
+    try:
+        mm.close()
+    except BufferError:
+        pass  # A parser view is still alive; the mapping is freed with it
+
 def process_single_pdf(input_path: str, output_path: str, 
                       parser: PDFParser, detector: HeadingDetector, 
                       formatter: JSONFormatter) -> bool:
@@ -23,17 +94,23 @@ def process_single_pdf(input_path: str, output_path: str,
         
         # Parse PDF structure
         print(f"Processing: {os.path.basename(input_path)}")
-        document_data = parser.extract_text_with_formatting(input_path)
+        mm = _map_pdf(input_path)
+        try:
+            if mm is not None:
+                document_data = parser.extract_text_with_formatting_stream(mm)
+            else:
+                document_data = parser.extract_text_with_formatting(input_path)
+        finally:
+            if mm is not None:
+                _unmap_pdf(mm)
         
         # Detect headings using clustering and heuristics
         title, headings = detector.identify_headings(document_data)
         
-        # Format output according to required JSON schema
-        output_json = formatter.create_outline_json(title, headings)
-        
-        # Write output file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_json, f, indent=2, ensure_ascii=False)
+        # Format output according to required JSON schema, streamed
+        # straight to the output file
+        if not formatter.stream_write(title, headings, output_path):
+            return False
             
         elapsed = time.time() - start_time
         print(f"✅ Completed in {elapsed:.2f}s: {os.path.basename(output_path)}")
@@ -60,11 +137,6 @@ def main():
         
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Initialize components
-    parser = PDFParser()
-    detector = HeadingDetector()
-    formatter = JSONFormatter()
-    
     # Find all PDF files
     pdf_files = list(input_dir.glob("*.pdf"))
     if not pdf_files:
@@ -73,13 +145,29 @@ def main():
     
     print(f"Found {len(pdf_files)} PDF file(s) to process")
     
-    # Process each PDF
+    # Process PDFs in parallel - each file is independent and CPU-bound
+    tasks = [(str(p), str(output_dir / f"{p.stem}.json")) for p in pdf_files]
+    
+    # Byte-identical PDFs are analyzed once and their outline copied
+    unique_tasks, copies = _dedupe_tasks(tasks)
+    max_workers = min(len(unique_tasks), os.cpu_count() or 1)
+    
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_worker_init) as executor:
+        results = list(executor.map(_process_one, unique_tasks, chunksize=1))
+    
     success_count = 0
-    for pdf_file in pdf_files:
-        output_file = output_dir / f"{pdf_file.stem}.json"
-        
-        if process_single_pdf(str(pdf_file), str(output_file), 
-                            parser, detector, formatter):
+    for (_, output_path), ok in zip(unique_tasks, results):
+        if not ok:
+            continue
+        success_count += 1
+        for copy_path in copies[output_path]:
+            try:
+                shutil.copyfile(output_path, copy_path)
+            except OSError as e:
+                print(f"❌ Error writing {copy_path}: {e}")
+                continue
+            print(f"♻️ Duplicate PDF, copied outline: {os.path.basename(copy_path)}")
             success_count += 1
     
     print(f"\n🎯 Successfully processed {success_count}/{len(pdf_files)} files")
@@ -10,8 +10,22 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any
 
+try:
+    import orjson
+except ImportError:  # Optional fast serializer - stdlib json is used without it
+    orjson = None
+
 from src.persona_intelligence import PersonaIntelligenceEngine
 
+def _write_json(output_path, data: Dict[str, Any]):
+    """Write JSON output (UTF-8, 2-space indent), via orjson when available"""
+    if orjson is not None:
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
 def load_input_specification(spec_file: str) -> Dict[str, Any]:
     """Load input specification (documents, persona, job)"""
     try:
@@ -78,8 +92,7 @@ def main():
         
         # Save result
         output_file = output_dir / "challenge1b_output.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        _write_json(output_file, result)
         
         print(f"✅ Analysis complete: {output_file}")
         print(f"📊 Extracted {len(result['extracted_sections'])} sections")
@@ -8,14 +8,111 @@ import sys
 import os
 import time
 import json
+import mmap
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # Optional fast serializer - stdlib json is used without it
+    orjson = None
 
 # Import optimized components
-from src.performance_optimizer import FastPDFProcessor, ResourceMonitor
-from src.pdf_parser import PDFParser
-from src.heading_detector import HeadingDetector
-from src.json_formatter import JSONFormatter
+from src.performance_optimizer import FastPDFProcessor, ResourceMonitor, SmartRouter
+
+# Per-worker router, created once in each child by _worker_init
+_router = None
+
+def _worker_init():
+    """Build the optimized processor and router once per worker process"""
+    global _router
+    _router = SmartRouter(FastPDFProcessor())
+
+def _write_json(output_path, data: Dict[str, Any]):
+    """
+    Write JSON output (UTF-8, 2-space indent) as a single buffer
+    Serializes once, then writes through a raw fd to skip stdio buffering
+    """
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    fd = os.open(str(output_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:  # os.write may return a short count
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def _prefetch(pdf_path: str):
+    """
+    Fault a PDF into the page cache ahead of the worker that parses it
+    Runs on a parent thread so disk reads overlap with parsing
+    """
+    try:
+        with open(pdf_path, 'rb') as f, \
+             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_WILLNEED)
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            
+            # Touch one byte per page to force it in
+            for offset in range(0, len(mm), mmap.PAGESIZE):
+                mm[offset]
+    except (OSError, ValueError):
+        pass  # Empty or unreadable file - the worker reports it
+
+def _report(input_path: str, output_path: str, result: Dict[str, Any],
+            start_time: float) -> Tuple[bool, int]:
+    """Write one PDF's outline and report it; (success, pages) for the batch report"""
+    _write_json(output_path, result)
+    
+    elapsed = time.time() - start_time
+    pages = len(result.get('outline', [])) or 1  # Estimate pages
+    
+    print(f"✅ {os.path.basename(input_path)}: {elapsed:.2f}s ({pages} pages)")
+    
+    # Quick performance check
+    if elapsed > 10 and pages <= 50:
+        print(f"⚠️ Performance warning: {elapsed:.2f}s for {pages} pages")
+    
+    return True, pages
+
+def _process_one(task: Tuple[str, str], strategy: str) -> Tuple[bool, int]:
+    """
+    Worker entry point for a single (input_path, output_path) pair
+    processed whole with the router's "serial" or "stream" strategy
+    """
+    input_path, output_path = task
+    
+    try:
+        start_time = time.time()
+        return _report(input_path, output_path, _router.process(input_path, strategy), start_time)
+        
+    except Exception as e:
+        print(f"❌ Error processing {os.path.basename(input_path)}: {e}")
+        return False, 0
+
+def _extract_range(input_path: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    """Worker entry point: extract pages [start, stop) of a PDF split across workers"""
+    return _router.processor.parser.extract_page_range(input_path, start, stop)
+
+def _merge_split(router: SmartRouter, task: Tuple[str, str], total_pages: int,
+                 chunks: List[Any], start_time: float) -> Tuple[bool, int]:
+    """Join the page chunks of a split PDF, in order, and detect its headings here"""
+    input_path, output_path = task
+    
+    try:
+        pages = [page for chunk in chunks for page in chunk.result()]
+        result = router.processor.outline_from_pages(input_path, total_pages, pages)
+        return _report(input_path, output_path, result, start_time)
+        
+    except Exception as e:
+        print(f"❌ Error processing {os.path.basename(input_path)}: {e}")
+        return False, 0
 
 def main():
     """
@@ -47,38 +144,42 @@ def main():
     
     print(f"🚀 Processing {len(pdf_files)} PDF file(s) with optimizations")
     
-    # Initialize optimized processor
-    processor = FastPDFProcessor()
+    # Route every PDF here: whole files go to one worker each, huge ones
+    # are split into page chunks over the same pool
+    tasks = [(str(p), str(output_dir / f"{p.stem}.json")) for p in pdf_files]
+    router = SmartRouter(FastPDFProcessor())
+    routes = [router.select(pdf_path) for pdf_path, _ in tasks]
     
-    # Process each PDF with optimizations
-    success_count = 0
-    total_pages = 0
+    cpus = os.cpu_count() or 1
+    splits = {i: router.processor.page_ranges(pages, cpus)
+              for i, (strategy, pages) in enumerate(routes) if strategy == "parallel"}
+    work_items = len(tasks) - len(splits) + sum(len(ranges) for ranges in splits.values())
+    max_workers = min(work_items, cpus)
     
-    for pdf_file in pdf_files:
-        try:
-            start_time = time.time()
-            
-            # Stream process for optimal performance
-            result = processor.stream_process_pdf(str(pdf_file))
-            
-            # Write output
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            
-            elapsed = time.time() - start_time
-            pages = len(result.get('outline', [])) or 1  # Estimate pages
-            total_pages += pages
-            
-            print(f"✅ {pdf_file.name}: {elapsed:.2f}s ({pages} pages)")
-            success_count += 1
-            
-            # Quick performance check
-            if elapsed > 10 and pages <= 50:
-                print(f"⚠️ Performance warning: {elapsed:.2f}s for {pages} pages")
-            
-        except Exception as e:
-            print(f"❌ Error processing {pdf_file.name}: {e}")
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=2) as prefetcher, \
+         ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_worker_init) as executor:
+        futures = []
+        for i, task in enumerate(tasks):
+            if i in splits:
+                futures.append([executor.submit(_extract_range, task[0], start, stop)
+                                for start, stop in splits[i]])
+            else:
+                futures.append(executor.submit(_process_one, task, routes[i][0]))
+        
+        # All work is queued at once (workers fork before any thread starts);
+        # warming later files in order overlaps their reads with earlier parses
+        for pdf_path, _ in tasks:
+            prefetcher.submit(_prefetch, pdf_path)
+        
+        # Split PDFs are merged in this process while workers keep going
+        results = [_merge_split(router, tasks[i], routes[i][1], futures[i], start_time)
+                   if i in splits else futures[i].result()
+                   for i in range(len(tasks))]
+    
+    success_count = sum(1 for ok, _ in results if ok)
+    total_pages = sum(pages for _, pages in results)
     
     # Performance report
     performance_report = monitor.get_performance_report()
@@ -88,7 +189,9 @@ def main():
     print(f"   ✅ Success: {success_count}/{len(pdf_files)} files")
     print(f"   📊 Total pages: {total_pages}")
     print(f"   ⏱️ Total time: {performance_report['elapsed_time']:.2f}s")
-    print(f"   💾 Peak memory: {performance_report['peak_memory_mb']:.1f} MB")
+    print(f"   💾 Peak memory: {performance_report['peak_memory_mb']:.1f} MB "
+          f"(worker peak {performance_report['worker_peak_memory_mb']:.1f} MB, "
+          f"main now {performance_report['current_memory_mb']:.1f} MB)")
     print(f"   🏃 Avg time/page: {performance_report['time_per_page']:.3f}s")
     
     # Compliance check
@@ -0,0 +1,105 @@
+"""
+Numba kernels for persona section scoring
+Compiled with numba when it is installed; callers fall back to sklearn / NumPy otherwise
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Optional JIT - sparse_cosine is None without it
+    numba = None
+
+prange = numba.prange if numba is not None else range
+
+def _sparse_cosine_kernel(q_idx, q_data, q_norm, c_indptr, c_indices, c_data, s_norms, out):
+    """
+    Cosine similarity of one sparse query against every section row
+    Gathers only the CSC columns of the query's nonzero terms, scaled by their weights
+    """
+    out[:] = 0.0
+
+    for k in range(q_idx.shape[0]):
+        col = q_idx[k]
+        weight = q_data[k]
+        for j in range(c_indptr[col], c_indptr[col + 1]):
+            out[c_indices[j]] += weight * c_data[j]
+
+    for row in range(out.shape[0]):
+        norm = q_norm * s_norms[row]
+        out[row] = out[row] / norm if norm != 0.0 else 0.0
+
+    return out
+
+# Compiled once per interpreter (and cached on disk) when numba is installed
+sparse_cosine = (numba.njit(cache=True, fastmath=True)(_sparse_cosine_kernel)
+                 if numba is not None else None)
+
+def row_norms(matrix) -> np.ndarray:
+    """L2 norm of every row of a sparse matrix"""
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+
+def query_cosine(query, matrix_csc, matrix_norms: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of a 1-row CSR query against every row of a CSC matrix
+    Requires numba (sparse_cosine is not None)
+    """
+    out = np.empty(matrix_csc.shape[0], dtype=np.float64)
+    return sparse_cosine(
+        query.indices, query.data, float(np.sqrt(query.data @ query.data)),
+        matrix_csc.indptr, matrix_csc.indices, matrix_csc.data, matrix_norms, out
+    )
+
+# Length factor by code: short, substantial (100-1000 words), very long
+_LENGTH_BONUS = np.array([0.0, 0.05, 0.02])
+
+def _section_scores_kernel(persona_hits, job_hits, n_persona, n_job, similarities,
+                           level_codes, level_lut, word_counts, out):
+    """
+    Relevance score of every section in one fused pass: keyword coverage,
+    query similarity, heading level weight and a length factor, capped at 1
+    Terms are added in a fixed order so equal inputs always tie exactly
+    """
+    for i in prange(out.shape[0]):
+        score = ((persona_hits[i] / n_persona) * 0.3
+                 + (job_hits[i] / n_job) * 0.4
+                 + similarities[i] * 0.3
+                 + level_lut[level_codes[i]])
+
+        # Prefer substantial sections, slight penalty for very long ones
+        words = word_counts[i]
+        if words > 1000:
+            score += 0.02
+        elif words >= 100:
+            score += 0.05
+
+        out[i] = score if score < 1.0 else 1.0
+
+    return out
+
+# Parallel over sections; None without numba
+section_scores_kernel = (numba.njit(cache=True, parallel=True)(_section_scores_kernel)
+                         if numba is not None else None)
+
+def section_scores(persona_hits: np.ndarray, job_hits: np.ndarray, n_persona: int, n_job: int,
+                   similarities: np.ndarray, level_codes: np.ndarray, level_lut: np.ndarray,
+                   word_counts: np.ndarray) -> np.ndarray:
+    """
+    Relevance scores of all sections at once
+    n_persona and n_job are the keyword list sizes (at least 1); level_codes
+    index level_lut, the heading level weights
+    """
+    out = np.empty(persona_hits.shape[0], dtype=np.float64)
+
+    if section_scores_kernel is not None:
+        return section_scores_kernel(persona_hits, job_hits, float(n_persona), float(n_job),
+                                     similarities, level_codes, level_lut, word_counts, out)
+
+    # Same formula, same term order, accumulated in place into one buffer
+    np.divide(persona_hits, n_persona, out=out)
+    out *= 0.3
+    out += (job_hits / n_job) * 0.4
+    out += similarities * 0.3
+    out += level_lut[level_codes]
+    out += _LENGTH_BONUS[(word_counts >= 100).astype(np.intp) + (word_counts > 1000)]
+    return np.minimum(out, 1.0, out=out)
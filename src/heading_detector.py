@@ -1,16 +1,166 @@
 """
 Intelligent Heading Detection Module
-Uses clustering and heuristic approaches for robust heading identification
+Uses font-size binning and heuristic approaches for robust heading identification
 Optimized for diverse PDF formats and multilingual content
 """
 
 import numpy as np
-from sklearn.cluster import KMeans, DBSCAN
-from sklearn.preprocessing import StandardScaler
-from collections import Counter, defaultdict
+from collections import Counter
 from typing import List, Dict, Any, Tuple, Optional
 import re
 import math
+import functools
+
+from src.pdf_parser import EL_TEXT, EL_FONTNAME, EL_SIZE, EL_FLAGS, EL_X0, EL_Y0
+
+try:
+    import numba
+except ImportError:  # Optional JIT - the NumPy expressions are used without it
+    numba = None
+
+def _combine_scores_kernel(sizes, x0, y0, flags, text_lens, page_heights,
+                           content_scores, bold_names, significant_sizes,
+                           median_size, font_weight, position_weight):
+    """
+    Fused per-element heading score (size + position + content + format)
+    Mirrors HeadingDetector._calculate_heading_score term by term
+    """
+    n = sizes.shape[0]
+    total_scores = np.empty(n)
+    
+    for i in numba.prange(n):
+        # Font size factor
+        size_score = 0.0
+        for sig in significant_sizes:
+            if sizes[i] == sig:
+                size_score = min(sizes[i] / (median_size * 2), 1.0) * font_weight
+                break
+        
+        # Position factor (left alignment, short text, top of page)
+        position = 0.0
+        if x0[i] < 100:
+            position += 0.5
+        if text_lens[i] < 100:
+            position += 0.3
+        if y0[i] > page_heights[i] * 0.8:
+            position += 0.2
+        position_score = min(position, 1.0) * position_weight
+        
+        # Bold/formatting factor
+        format_score = 0.0
+        if flags[i] & 16:
+            format_score = 0.2
+        elif bold_names[i]:
+            format_score = 0.15
+        
+        total = size_score + position_score + content_scores[i] + format_score
+        
+        # Penalty for very long text (likely paragraphs)
+        if text_lens[i] > 200:
+            total *= 0.5
+        
+        total_scores[i] = min(total, 1.0)
+    
+    return total_scores
+
+# Compiled once per interpreter (and cached on disk) when numba is installed
+_combine_scores = (numba.njit(parallel=True, cache=True)(_combine_scores_kernel)
+                   if numba is not None else None)
+
+
+# Multilingual patterns for bonus points
+HEADING_PATTERNS = {
+    'english': [
+        r'^[A-Z][A-Z\s]{2,}$',  # ALL CAPS headings
+        r'^\d+\.?\s+[A-Z]',      # Numbered headings (1. Introduction)
+        r'^[IVX]+\.?\s+[A-Z]',   # Roman numerals
+        r'^Chapter\s+\d+',       # Chapter headings
+        r'^Section\s+\d+'        # Section headings
+    ],
+    'multilingual': [
+        r'^[\u4e00-\u9fff]+',    # Chinese/Japanese characters
+        r'^[\u3040-\u309f]+',    # Hiragana
+        r'^[\u30a0-\u30ff]+',    # Katakana
+        r'^[\u0590-\u05ff]+',    # Hebrew
+        r'^[\u0600-\u06ff]+',    # Arabic
+    ]
+}
+
+# English patterns compiled once into a single alternation; the named
+# group that fired (match.lastgroup) identifies the heading style
+_ENGLISH_RE = re.compile('|'.join(
+    f'(?P<english{i}>{p})' for i, p in enumerate(HEADING_PATTERNS['english'])
+))
+
+# Multilingual patterns are all "starts with a character of script X",
+# so they collapse into one anchored character class
+_MULTILINGUAL_RE = re.compile(
+    '[' + ''.join(p[2:-2] for p in HEADING_PATTERNS['multilingual']) + ']'
+)
+
+# Connective phrases typical of body text rather than headings
+_BODY_PHRASE_RE = re.compile(r'however|therefore|moreover|furthermore', re.IGNORECASE)
+
+# Bare page numbers filtered out of the final outline
+_PAGENUM_RE = re.compile(r'^\d+$')
+
+@functools.lru_cache(maxsize=8192)
+def _content_score(text: str) -> float:
+    """
+    Score based on textual patterns that indicate headings[8]
+    Memoized - running headers and repeated section titles recur many times per document
+    """
+    score = 0.0
+    
+    # Check English patterns
+    if _ENGLISH_RE.match(text):
+        score += 0.3
+    
+    # Check multilingual patterns (bonus points)
+    if _MULTILINGUAL_RE.match(text):
+        score += 0.4  # Higher score for multilingual detection
+    
+    # Capitalization patterns
+    word_count = len(text.split())
+    if text.isupper() and word_count <= 10:
+        score += 0.2
+    elif text.istitle() and word_count <= 8:
+        score += 0.15
+    
+    # Length characteristics
+    if 2 <= word_count <= 8:
+        score += 0.1
+    
+    # Avoid common body text patterns
+    if _BODY_PHRASE_RE.search(text):
+        score -= 0.2
+    
+    return max(score, 0.0)
+
+class TextElements:
+    """
+    Struct-of-arrays view of every candidate text element in a document
+    Numeric attributes live in parallel NumPy columns, strings in lists
+    """
+    
+    __slots__ = ("texts", "fontnames", "sizes", "x0", "y0", "flags",
+                 "page_nums", "page_heights", "text_lens")
+    
+    def __init__(self, texts: List[str], fontnames: List[str], sizes: List[float],
+                 x0: List[float], y0: List[float], flags: List[int],
+                 page_nums: List[int], page_heights: List[float]):
+        self.texts = texts
+        self.fontnames = fontnames
+        self.sizes = np.array(sizes, dtype=np.float64)
+        self.x0 = np.array(x0, dtype=np.float64)
+        self.y0 = np.array(y0, dtype=np.float64)
+        self.flags = np.array(flags, dtype=np.int64)
+        self.page_nums = np.array(page_nums, dtype=np.int64)
+        self.page_heights = np.array(page_heights, dtype=np.float64)
+        self.text_lens = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    
+    def __len__(self) -> int:
+        return len(self.texts)
 
 class HeadingDetector:
     """
@@ -24,24 +174,7 @@ class HeadingDetector:
         self.position_weight = 0.3      # Weight for positional scoring
         self.content_weight = 0.2       # Weight for content pattern scoring
         self.font_weight = 0.5          # Weight for font characteristics
-        
-        # Multilingual patterns for bonus points
-        self.heading_patterns = {
-            'english': [
-                r'^[A-Z][A-Z\s]{2,}$',  # ALL CAPS headings
-                r'^\d+\.?\s+[A-Z]',      # Numbered headings (1. Introduction)
-                r'^[IVX]+\.?\s+[A-Z]',   # Roman numerals
-                r'^Chapter\s+\d+',       # Chapter headings
-                r'^Section\s+\d+'        # Section headings
-            ],
-            'multilingual': [
-                r'^[\u4e00-\u9fff]+',    # Chinese/Japanese characters
-                r'^[\u3040-\u309f]+',    # Hiragana
-                r'^[\u30a0-\u30ff]+',    # Katakana
-                r'^[\u0590-\u05ff]+',    # Hebrew
-                r'^[\u0600-\u06ff]+',    # Arabic
-            ]
-        }
+        # Content patterns are module-level (HEADING_PATTERNS), compiled once
         
     def identify_headings(self, document_data: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
         """
@@ -66,10 +199,13 @@ class HeadingDetector:
         font_clusters = self._analyze_font_distribution(all_elements)
         
         # Score each element for heading likelihood
-        scored_elements = self._score_heading_candidates(all_elements, font_clusters)
+        candidates, scores = self._score_heading_candidates(all_elements, font_clusters)
         
         # Filter and classify headings by hierarchy
-        headings = self._classify_heading_hierarchy(scored_elements)
+        headings = self._classify_heading_hierarchy(all_elements, candidates, scores)
+        
+        # Repeats are a per-document effect; don't let the memo grow across a batch
+        _content_score.cache_clear()
         
         return title, headings
     
@@ -107,14 +243,14 @@ class HeadingDetector:
         title_candidates = []
         
         for element in elements[:10]:  # Check first 10 elements
-            text = element.get("text", "").strip()
-            font_info = element.get("font_info", {})
-            
+            text = element[EL_TEXT].strip()
             if not text or len(text) < 5:
                 continue
             
             # Score based on multiple factors
-            score = self._calculate_title_score(text, font_info, page_height)
+            score = self._calculate_title_score(
+                text, element[EL_SIZE], element[EL_Y0], element[EL_FLAGS], page_height
+            )
             
             if score > 0.6:  # Threshold for title consideration
                 title_candidates.append((text, score))
@@ -126,19 +262,18 @@ class HeadingDetector:
         
         return ""
     
-    def _calculate_title_score(self, text: str, font_info: Dict, page_height: float) -> float:
+    def _calculate_title_score(self, text: str, font_size: float, y_pos: float,
+                               flags: int, page_height: float) -> float:
         """
         Multi-factor scoring for title identification
         """
         score = 0.0
         
         # Font size factor (normalized)
-        font_size = font_info.get("size", 12)
         if font_size > 16:
             score += 0.3 * min(font_size / 24.0, 1.0)  # Cap at 24pt
         
         # Position factor (top of page gets higher score)
-        y_pos = font_info.get("y0", 0)
         position_score = max(0, (y_pos / page_height) * 0.3)
         score += position_score
         
@@ -150,66 +285,66 @@ class HeadingDetector:
             score += 0.2  # Reasonable title length
         
         # Bold/weight detection (for PyMuPDF flags)
-        flags = font_info.get("flags", 0)
-        if flags & 2**4:  # Bold flag
+        if flags & 16:  # Bold flag
             score += 0.2
         
         return min(score, 1.0)
     
-    def _collect_text_elements(self, document_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _collect_text_elements(self, document_data: Dict[str, Any]) -> TextElements:
         """
         Collect all text elements with page context for analysis
+        Fills one column per attribute instead of copying every element dict
         """
-        all_elements = []
+        texts, fontnames, sizes = [], [], []
+        x0s, y0s, flags = [], [], []
+        page_nums, page_heights = [], []
         
         for page in document_data.get("pages", []):
             page_num = page.get("page_number", 1)
+            page_height = page.get("height", 792)
             
             for element in page.get("text_elements", []):
-                # Add page context to element
-                enhanced_element = element.copy()
-                enhanced_element["page_number"] = page_num
-                enhanced_element["page_height"] = page.get("height", 792)
-                enhanced_element["page_width"] = page.get("width", 612)
-                
                 # Clean and validate text
-                text = element.get("text", "").strip()
-                if text and len(text) >= 3:  # Minimum text length
-                    all_elements.append(enhanced_element)
-        
-        return all_elements
+                text = element[EL_TEXT]
+                stripped = text.strip()
+                if not stripped or len(stripped) < 3:  # Minimum text length
+                    continue
+                
+                texts.append(text)
+                fontnames.append(element[EL_FONTNAME])
+                sizes.append(element[EL_SIZE])
+                x0s.append(element[EL_X0])
+                y0s.append(element[EL_Y0])
+                flags.append(element[EL_FLAGS])
+                page_nums.append(page_num)
+                page_heights.append(page_height)
+        
+        return TextElements(texts, fontnames, sizes, x0s, y0s, flags,
+                            page_nums, page_heights)
     
-    def _analyze_font_distribution(self, elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_font_distribution(self, elements: TextElements) -> Dict[str, Any]:
         """
         Statistical analysis of font characteristics for clustering[3][6]
         """
-        font_sizes = []
-        font_names = []
-        
-        for element in elements:
-            font_info = element.get("font_info", {})
-            font_sizes.append(font_info.get("size", 12))
-            font_names.append(font_info.get("fontname", ""))
-        
-        font_sizes = np.array(font_sizes)
+        sizes = elements.sizes
         
         # Statistical analysis
+        median_size = float(np.median(sizes))
+        int_sizes = np.maximum(sizes.astype(np.int32), 0)
+        counts = np.bincount(int_sizes)
+        
         analysis = {
-            "median_size": np.median(font_sizes),
-            "mean_size": np.mean(font_sizes),
-            "std_size": np.std(font_sizes),
-            "size_distribution": Counter(font_sizes.astype(int)),
-            "font_name_counts": Counter(font_names)
+            "median_size": median_size,
+            "mean_size": float(np.mean(sizes)),
+            "std_size": float(np.std(sizes)),
+            "size_distribution": {int(size): int(counts[size]) for size in np.nonzero(counts)[0]},
+            "font_name_counts": Counter(elements.fontnames)
         }
         
         # Identify significant font sizes (potential headings)[10]
-        significant_sizes = []
-        for size, count in analysis["size_distribution"].items():
-            if size > analysis["median_size"] * self.font_size_threshold:
-                if count >= 2:  # Must appear at least twice
-                    significant_sizes.append(size)
-        
-        analysis["significant_sizes"] = sorted(significant_sizes, reverse=True)
+        # Must exceed the median threshold and appear at least twice
+        mask = (np.arange(counts.size) > median_size * self.font_size_threshold) & (counts >= 2)
+        analysis["significant_sizes"] = np.nonzero(mask)[0][::-1].tolist()
         
         # Clustering approach for font characteristics
         if len(elements) > 10:
@@ -219,230 +354,197 @@ class HeadingDetector:
         
         return analysis
     
-    def _perform_font_clustering(self, elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _perform_font_clustering(self, elements: TextElements) -> Dict[str, Any]:
         """
-        K-means clustering of font attributes for heading detection[10][16]
+        Group elements into font-size bins for heading detection[10][16]
+        Font size is the discriminating feature, so 1-D binning on half-point
+        steps replaces K-means over the full feature matrix
         """
-        # Prepare feature vectors
-        features = []
-        for element in elements:
-            font_info = element.get("font_info", {})
-            
-            feature_vector = [
-                font_info.get("size", 12),                    # Font size
-                len(element.get("text", "")),                 # Text length
-                font_info.get("x0", 0),                       # X position
-                font_info.get("y0", 0),                       # Y position
-                font_info.get("flags", 0) & 16,              # Bold flag
-            ]
-            features.append(feature_vector)
-        
-        features = np.array(features)
-        
-        # Normalize features
-        scaler = StandardScaler()
-        features_scaled = scaler.fit_transform(features)
-        
-        # Perform clustering (3-5 clusters for different heading levels)
-        n_clusters = min(5, max(3, len(elements) // 10))
-        
         try:
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            cluster_labels = kmeans.fit_predict(features_scaled)
+            # Quantize to 0.5pt with a fixed scale so near-identical sizes
+            # share a bin - no per-document normalization pass needed
+            half_points = np.rint(elements.sizes * 2)
+            unique_bins, inverse = np.unique(half_points, return_inverse=True)
+            
+            # Order cluster ids by descending font size (largest = 0)
+            cluster_labels = (unique_bins.size - 1) - inverse
             
             return {
                 "labels": cluster_labels.tolist(),
-                "centers": kmeans.cluster_centers_.tolist(),
-                "n_clusters": n_clusters
+                "centers": (unique_bins[::-1] / 2).tolist(),
+                "n_clusters": int(unique_bins.size)
             }
         except Exception:
             # Fallback to simple grouping
             return {"labels": [0] * len(elements), "centers": []}
     
-    def _score_heading_candidates(self, elements: List[Dict[str, Any]], 
-                                font_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _score_heading_candidates(self, elements: TextElements,
+                                font_analysis: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
         """
         Score each text element for heading likelihood using multi-factor approach[8]
+        Returns (element indices, scores) of candidates above the threshold
         """
-        scored_elements = []
         median_size = font_analysis.get("median_size", 12)
         significant_sizes = font_analysis.get("significant_sizes", [])
         
-        for i, element in enumerate(elements):
-            text = element.get("text", "")
-            font_info = element.get("font_info", {})
-            
-            # Calculate comprehensive heading score
-            score = self._calculate_heading_score(
-                element, font_info, median_size, significant_sizes, font_analysis
-            )
-            
-            if score > 0.3:  # Threshold for heading consideration
-                scored_element = element.copy()
-                scored_element["heading_score"] = score
-                scored_element["cluster_id"] = font_analysis.get("clusters", {}).get("labels", [0])[i]
-                scored_elements.append(scored_element)
+        # Calculate comprehensive heading scores for all elements at once
+        scores = self._calculate_heading_score(elements, median_size, significant_sizes)
         
-        return scored_elements
+        # Threshold for heading consideration
+        candidates = np.nonzero(scores > 0.3)[0]
+        return candidates, scores[candidates]
     
-    def _calculate_heading_score(self, element: Dict[str, Any], font_info: Dict[str, Any],
-                               median_size: float, significant_sizes: List[float],
-                               font_analysis: Dict[str, Any]) -> float:
+    def _calculate_heading_score(self, elements: TextElements, median_size: float,
+                               significant_sizes: List[float]) -> np.ndarray:
         """
         Multi-factor heading score calculation
+        Returns one score per element
         """
-        text = element.get("text", "")
-        font_size = font_info.get("size", 12)
+        n = len(elements)
+        sizes = elements.sizes
+        
+        # Content pattern factor (numbering, capitalization, etc.) - needs regex per text
+        content_score = np.fromiter(
+            (_content_score(text) for text in elements.texts),
+            dtype=np.float64, count=n
+        ) * self.content_weight
+        
+        # "bold" in the font name backs up the fitz bold flag. A document uses
+        # a handful of fonts, so intern names to small ids and test each once
+        font_ids = {}
+        name_ids = np.fromiter(
+            (font_ids.setdefault(fontname, len(font_ids)) for fontname in elements.fontnames),
+            dtype=np.int64, count=n
+        )
+        bold_fonts = np.fromiter(
+            ("bold" in fontname.lower() for fontname in font_ids),
+            dtype=bool, count=len(font_ids)
+        )
+        bold_names = bold_fonts[name_ids]
+        
+        # Numeric terms fuse into one compiled pass when numba is available
+        if _combine_scores is not None and median_size:
+            return _combine_scores(
+                sizes, elements.x0, elements.y0, elements.flags, elements.text_lens,
+                elements.page_heights, content_score, bold_names,
+                np.asarray(significant_sizes, dtype=np.float64),
+                float(median_size), self.font_weight, self.position_weight
+            )
         
         # Font size factor
-        size_score = 0.0
-        if font_size in significant_sizes:
-            size_score = min(font_size / (median_size * 2), 1.0) * self.font_weight
+        with np.errstate(divide="ignore", invalid="ignore"):
+            size_score = np.where(
+                np.isin(sizes, significant_sizes),
+                np.minimum(sizes / (median_size * 2), 1.0) * self.font_weight,
+                0.0
+            )
         
         # Position factor (left alignment, whitespace)
-        position_score = self._calculate_position_score(element, font_info) * self.position_weight
-        
-        # Content pattern factor (numbering, capitalization, etc.)
-        content_score = self._calculate_content_score(text) * self.content_weight
+        position_score = self._calculate_position_score(elements) * self.position_weight
         
-        # Bold/formatting factor
-        format_score = 0.0
-        flags = font_info.get("flags", 0)
-        if flags & 16:  # Bold flag in fitz
-            format_score = 0.2
-        elif "bold" in font_info.get("fontname", "").lower():
-            format_score = 0.15
+        # Bold/formatting factor: bold flag in fitz, else "bold" in the font name
+        format_score = np.where(elements.flags & 16, 0.2, np.where(bold_names, 0.15, 0.0))
         
         total_score = size_score + position_score + content_score + format_score
         
         # Penalty for very long text (likely paragraphs)
-        if len(text) > 200:
-            total_score *= 0.5
+        total_score = np.where(elements.text_lens > 200, total_score * 0.5, total_score)
         
-        return min(total_score, 1.0)
+        return np.minimum(total_score, 1.0)
     
-    def _calculate_position_score(self, element: Dict[str, Any], font_info: Dict[str, Any]) -> float:
+    def _calculate_position_score(self, elements: TextElements) -> np.ndarray:
         """
         Calculate score based on positioning characteristics
+        Returns one score per element
         """
-        score = 0.0
-        
         # Left alignment (headings often start at left margin)
-        x_pos = font_info.get("x0", 0)
-        if x_pos < 100:  # Near left margin
-            score += 0.5
-        
-        # Isolation (surrounded by whitespace)
-        text_length = len(element.get("text", ""))
-        if text_length < 100:  # Short text more likely to be heading
-            score += 0.3
-        
-        # Top of page bonus
-        page_height = element.get("page_height", 792)
-        y_pos = font_info.get("y0", 0)
-        if y_pos > page_height * 0.8:  # Top 20% of page
-            score += 0.2
-        
-        return min(score, 1.0)
-    
-    def _calculate_content_score(self, text: str) -> float:
-        """
-        Score based on textual patterns that indicate headings[8]
-        """
-        score = 0.0
+        score = np.where(elements.x0 < 100, 0.5, 0.0)
         
-        # Check English patterns
-        for pattern in self.heading_patterns['english']:
-            if re.match(pattern, text):
-                score += 0.3
-                break
+        # Isolation (surrounded by whitespace) - short text more likely heading
+        score += np.where(elements.text_lens < 100, 0.3, 0.0)
         
-        # Check multilingual patterns (bonus points)
-        for pattern in self.heading_patterns['multilingual']:
-            if re.search(pattern, text):
-                score += 0.4  # Higher score for multilingual detection
-                break
+        # Top of page bonus (top 20% of page)
+        score += np.where(elements.y0 > elements.page_heights * 0.8, 0.2, 0.0)
         
-        # Capitalization patterns
-        if text.isupper() and len(text.split()) <= 10:
-            score += 0.2
-        elif text.istitle() and len(text.split()) <= 8:
-            score += 0.15
-        
-        # Length characteristics
-        word_count = len(text.split())
-        if 2 <= word_count <= 8:
-            score += 0.1
-        
-        # Avoid common body text patterns
-        if any(phrase in text.lower() for phrase in ['however', 'therefore', 'moreover', 'furthermore']):
-            score -= 0.2
-        
-        return max(score, 0.0)
+        return np.minimum(score, 1.0)
     
-    def _classify_heading_hierarchy(self, scored_elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _classify_heading_hierarchy(self, elements: TextElements, candidates: np.ndarray,
+                                  scores: np.ndarray) -> List[Dict[str, Any]]:
         """
         Classify headings into H1, H2, H3 hierarchy based on font sizes and scores
         """
-        if not scored_elements:
+        if not candidates.size:
             return []
         
-        # Sort by heading score (descending)
-        scored_elements.sort(key=lambda x: x["heading_score"], reverse=True)
+        sizes = elements.sizes[candidates]
         
-        # Group by font size for hierarchical classification
-        size_groups = defaultdict(list)
-        for element in scored_elements:
-            font_size = element.get("font_info", {}).get("size", 12)
-            size_groups[font_size].append(element)
+        # Largest font sizes map to H1, H2, H3 (limit to 3 levels)
+        levels = np.full(candidates.size, -1)
+        for level, font_size in enumerate(self._largest_sizes(sizes, 3)):
+            levels[sizes == font_size] = level
         
-        # Sort font sizes (largest first for H1, H2, H3)
-        sorted_sizes = sorted(size_groups.keys(), reverse=True)
+        # Apply additional filters - higher threshold for final selection
+        keep = np.nonzero((levels >= 0) & (scores > 0.4))[0]
+        if not keep.size:
+            return []
         
-        headings = []
+        indices = candidates[keep]
+        levels = levels[keep]
+        pages = elements.page_nums[indices]
         
-        # Assign heading levels based on font size hierarchy
-        for i, font_size in enumerate(sorted_sizes[:3]):  # Limit to 3 levels
-            level = f"H{i+1}"
-            
-            for element in size_groups[font_size]:
-                # Apply additional filters
-                if element["heading_score"] > 0.4:  # Higher threshold for final selection
-                    heading = {
-                        "level": level,
-                        "text": element.get("text", "").strip(),
-                        "page": element.get("page_number", 1)
-                    }
-                    headings.append(heading)
-        
-        # Sort by page number for final output
-        headings.sort(key=lambda x: (x["page"], x["level"]))
+        # Sort by page number, then level; ties keep highest score first
+        order = np.lexsort((indices, -scores[keep], levels, pages))
+        
+        headings = [
+            {
+                "level": f"H{levels[k] + 1}",
+                "text": elements.texts[indices[k]].strip(),
+                "page": int(pages[k])
+            }
+            for k in order.tolist()
+        ]
         
         # Remove duplicates and clean up
         return self._deduplicate_headings(headings)
     
+    def _largest_sizes(self, sizes: np.ndarray, k: int) -> List[float]:
+        """Up to k distinct font sizes in descending order, one O(N) pass each"""
+        largest = []
+        while sizes.size and len(largest) < k:
+            font_size = sizes.max()
+            largest.append(font_size)
+            sizes = sizes[sizes < font_size]
+        return largest
+    
     def _deduplicate_headings(self, headings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Remove duplicate headings and clean up the final list
         """
-        seen_texts = set()
+        seen_hashes = set()
         unique_headings = []
         
         for heading in headings:
-            text_key = heading["text"].lower().strip()
+            # Text is already stripped by _classify_heading_hierarchy
+            text_key = heading["text"].casefold()
             
-            # Skip if already seen or too short
-            if text_key in seen_texts or len(text_key) < 3:
+            # Skip if too short or already seen
+            if len(text_key) < 3:
+                continue
+            key = hash(text_key)
+            if key in seen_hashes:
                 continue
             
             # Skip if it looks like page numbers or references
-            if re.match(r'^\d+$', text_key) or text_key.startswith('page '):
+            if _PAGENUM_RE.match(text_key) or text_key.startswith('page '):
                 continue
             
-            seen_texts.add(text_key)
+            seen_hashes.add(key)
             unique_headings.append(heading)
+            
+            if len(unique_headings) == 50:  # Limit total headings to reasonable number
+                break
         
-        return unique_headings[:50]  # Limit total headings to reasonable number
+        return unique_headings
 
     def validate_headings(self, headings: List[Dict[str, Any]]) -> bool:
         """
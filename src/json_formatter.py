@@ -4,9 +4,50 @@ Ensures compliance with competition requirements
 """
 
 import json
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Iterable, Iterator
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # Optional fast serializer - stdlib json is used without it
+    orjson = None
+
+# Output schema, as sets for O(1) membership tests
+_REQUIRED_FIELDS = frozenset(("level", "text", "page"))
+_VALID_LEVELS = frozenset(("H1", "H2", "H3"))
+
+# Whitespace runs collapse to one space; NULs and replacement chars are extraction artifacts
+_WS = re.compile(r"\s+")
+_BAD = re.compile("[\x00\ufffd]")
+
+def _clean_text(text: str) -> str:
+    """Clean heading text"""
+    if not text or not isinstance(text, str):
+        return ""
+    
+    # Collapse whitespace and remove common artifacts in one C-level sweep each
+    cleaned = _BAD.sub("", _WS.sub(" ", text)).strip()
+    
+    # Limit length for headings
+    if len(cleaned) > 150:
+        cleaned = cleaned[:150] + "..."
+    
+    return cleaned
+
+def _dumps_indented(obj: Any) -> bytes:
+    """Serialize with a 2-space indent to UTF-8, via orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+def _page_number(page: Any) -> int:
+    """Coerce a page number to a positive int, defaulting to 1"""
+    try:
+        return max(int(page), 1)
+    except (ValueError, TypeError):
+        return 1
+
 class JSONFormatter:
     """
     Formats heading detection results into required JSON schema
@@ -14,8 +55,8 @@ class JSONFormatter:
     
     def __init__(self):
         """Initialize formatter with validation schemas"""
-        self.required_fields = ["level", "text", "page"]
-        self.valid_levels = ["H1", "H2", "H3"]
+        self.required_fields = _REQUIRED_FIELDS
+        self.valid_levels = _VALID_LEVELS
     
     def create_outline_json(self, title: str, headings: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -29,7 +70,7 @@ class JSONFormatter:
             Dictionary matching required JSON format
         """
         # Validate and clean headings
-        validated_headings = self._validate_headings(headings)
+        validated_headings = list(self._validate_headings(headings))
         
         # Create output structure
         output = {
@@ -39,42 +80,44 @@ class JSONFormatter:
         
         return output
     
-    def _validate_headings(self, headings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def stream_write(self, title: str, headings: Iterable[Dict[str, Any]], filepath: str) -> bool:
+        """
+        Validate headings and write the outline JSON one heading at a time
+        Produces the same bytes as save_json(create_outline_json(...)) without
+        building the output dict first
+        """
+        try:
+            with open(filepath, 'wb') as f:
+                f.write(b'{\n  "title": ' + _dumps_indented(self._clean_title(title)) +
+                        b',\n  "outline": [')
+                
+                first = True
+                for heading in self._validate_headings(headings):
+                    # Re-indent the entry one level deeper; newlines inside
+                    # string values are always escaped, so this is safe
+                    f.write((b'\n    ' if first else b',\n    ') +
+                            _dumps_indented(heading).replace(b'\n', b'\n    '))
+                    first = False
+                
+                # An empty outline is written inline as "[]"
+                f.write(b']\n}' if first else b'\n  ]\n}')
+            return True
+        except Exception as e:
+            print(f"Error saving JSON: {e}")
+            return False
+    
+    def _validate_headings(self, headings: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
         """
         Validate and clean heading entries
         """
-        validated = []
-        
-        for heading in headings:
-            # Check required fields
-            if not all(field in heading for field in self.required_fields):
-                continue
-            
-            # Validate level
-            level = heading.get("level", "")
-            if level not in self.valid_levels:
-                continue
-            
-            # Clean and validate text
-            text = self._clean_text(heading.get("text", ""))
-            if not text or len(text) < 3:
-                continue
-            
-            # Validate page number
-            try:
-                page = int(heading.get("page", 1))
-                if page < 1:
-                    page = 1
-            except (ValueError, TypeError):
-                page = 1
-            
-            validated.append({
-                "level": level,
-                "text": text,
-                "page": page
-            })
-        
-        return validated
+        # Single pass: schema check, text cleaning and page coercion inline
+        return (
+            {"level": level, "text": text, "page": _page_number(heading["page"])}
+            for heading in headings
+            if _REQUIRED_FIELDS <= heading.keys()
+            and (level := heading["level"]) in _VALID_LEVELS
+            and len(text := _clean_text(heading["text"])) >= 3
+        )
     
     def _clean_title(self, title: str) -> str:
         """Clean and validate document title"""
@@ -82,7 +125,7 @@ class JSONFormatter:
             return "Untitled Document"
         
         # Remove excessive whitespace and newlines
-        cleaned = " ".join(title.split())
+        cleaned = _WS.sub(" ", title).strip()
         
         # Limit length
         if len(cleaned) > 200:
@@ -90,30 +133,13 @@ class JSONFormatter:
         
         return cleaned or "Untitled Document"
     
-    def _clean_text(self, text: str) -> str:
-        """Clean heading text"""
-        if not text or not isinstance(text, str):
-            return ""
-        
-        # Remove excessive whitespace and newlines
-        cleaned = " ".join(text.split())
-        
-        # Remove common artifacts
-        cleaned = cleaned.replace('\x00', '').replace('\ufffd', '')
-        
-        # Limit length for headings
-        if len(cleaned) > 150:
-            cleaned = cleaned[:150] + "..."
-        
-        return cleaned.strip()
-    
     def save_json(self, output_data: Dict[str, Any], filepath: str) -> bool:
         """
         Save JSON output to file with proper formatting
         """
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(_dumps_indented(output_data))
             return True
         except Exception as e:
             print(f"Error saving JSON: {e}")
@@ -5,10 +5,30 @@ Optimized for speed and accuracy within competition constraints
 
 import fitz  # PyMuPDF
 import pdfplumber
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
+import io
+import hashlib
 import logging
+import mmap
 from pathlib import Path
 
+_LOG = logging.getLogger(__name__)
+
+# Text elements are fixed-schema tuples rather than nested dicts:
+# (text, fontname, size, flags, x0, y0, x1, y1)
+EL_TEXT, EL_FONTNAME, EL_SIZE, EL_FLAGS, EL_X0, EL_Y0, EL_X1, EL_Y1 = range(8)
+
+# A PDF source is either a filesystem path or a bytes-like buffer (e.g. mmap)
+PDFSource = Union[str, Path, bytes, bytearray, memoryview, mmap.mmap]
+
+def pdf_digest(pdf_path: Union[str, Path]) -> Optional[bytes]:
+    """Content digest of a PDF file, streamed from disk; None when it cannot be read"""
+    try:
+        with open(pdf_path, 'rb') as f:
+            return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).digest()
+    except OSError:
+        return None
+
 class PDFParser:
     """
     Robust PDF parser that extracts text with formatting metadata
@@ -17,71 +37,153 @@ class PDFParser:
     
     def __init__(self):
         """Initialize parser with optimized settings"""
-        self.logger = logging.getLogger(__name__)
-        
         # Performance optimization flags
         self.use_ocr = False  # Only enable if no text layer detected
         self.max_pages_preview = 5  # Preview pages to detect text availability
+        self.min_text_chars = 100  # Less text than this counts as a failed extraction
+        self.min_table_rules = 12  # Ruled segments on a page before tables are probed
+        self._method_cache = {}  # (path, size, mtime) -> chosen extraction method
         
-    def extract_text_with_formatting(self, pdf_path: str) -> Dict[str, Any]:
+    def extract_text_with_formatting(self, pdf_path: str,
+                                     doc: Optional[fitz.Document] = None) -> Dict[str, Any]:
         """
         Main extraction method that returns structured document data
         
         Args:
             pdf_path: Path to PDF file
+            doc: Optional fitz document already open on the PDF; reused, not closed
+            
+        Returns:
+            Dictionary containing pages with text and formatting metadata
+        """
+        return self._extract(pdf_path, doc)
+    
+    def extract_text_with_formatting_stream(self, stream,
+                                            doc: Optional[fitz.Document] = None) -> Dict[str, Any]:
+        """
+        Same as extract_text_with_formatting, but reads from a bytes-like
+        buffer such as an mmap of the PDF instead of re-opening the path
+        
+        Args:
+            stream: Bytes-like object holding the whole PDF
+            doc: Optional fitz document already open on the PDF; reused, not closed
             
         Returns:
             Dictionary containing pages with text and formatting metadata
         """
+        return self._extract(stream, doc)
+    
+    def _extract(self, source: PDFSource, doc: Optional[fitz.Document] = None) -> Dict[str, Any]:
+        """Dispatch extraction for a path or in-memory PDF source"""
+        owns_doc = doc is None
         try:
-            # First, determine best extraction strategy
-            extraction_method = self._determine_extraction_method(pdf_path)
+            # First, determine best extraction strategy; the preview's fitz
+            # document stays open so the parse below doesn't reopen the file
+            extraction_method, doc = self._determine_extraction_method(source, doc)
             
-            if extraction_method == "pdfplumber":
-                return self._extract_with_pdfplumber(pdf_path)
-            elif extraction_method == "fitz":
-                return self._extract_with_fitz(pdf_path)
-            else:
-                # Fallback: try both and merge results
-                return self._extract_hybrid_approach(pdf_path)
+            try:
+                if extraction_method == "pdfplumber":
+                    return self._extract_with_pdfplumber(source)
+                elif extraction_method == "fitz":
+                    return self._extract_with_fitz(source, doc)
+                else:
+                    # Fallback: try both and merge results
+                    return self._extract_hybrid_approach(source, doc)
+            finally:
+                if owns_doc and doc is not None:
+                    doc.close()
                 
-        except Exception as e:
-            self.logger.error(f"Failed to extract from {pdf_path}: {e}")
+        except Exception:
+            _LOG.error("Failed to extract from %s", self._describe(source), exc_info=True)
             return self._create_empty_document()
     
-    def _determine_extraction_method(self, pdf_path: str) -> str:
+    def _open_fitz(self, source: PDFSource):
+        """Open a fitz document from a path or, zero-copy, from a buffer"""
+        if isinstance(source, (str, Path)):
+            return fitz.open(source)
+        return fitz.open(stream=memoryview(source), filetype="pdf")
+    
+    def _open_pdfplumber(self, source: PDFSource):
+        """Open a pdfplumber document from a path, file-like mmap or bytes"""
+        if isinstance(source, (str, Path)) or hasattr(source, "read"):
+            return pdfplumber.open(source)
+        return pdfplumber.open(io.BytesIO(source))
+    
+    def _describe(self, source: PDFSource) -> str:
+        """Human-readable name of a PDF source for log messages"""
+        if isinstance(source, (str, Path)):
+            return str(source)
+        return f"<in-memory PDF, {len(source)} bytes>"
+    
+    def _determine_extraction_method(self, source: PDFSource,
+                                     doc: Optional[fitz.Document] = None) -> Tuple[str, Optional[fitz.Document]]:
         """
         Analyze PDF to choose optimal extraction method
-        Prioritizes speed while maintaining accuracy
+        PyMuPDF spans are the default; pdfplumber is kept for table-heavy files
+        Returns the method and the fitz document used for the preview (doc,
+        when one is given)
+        """
+        if doc is None:
+            try:
+                # Quick preview with fitz - far cheaper to open than pdfplumber
+                doc = self._open_fitz(source)
+            except Exception:
+                return "fitz", None  # Safe fallback
+        
+        cache_key = self._method_cache_key(source)
+        method = self._method_cache.get(cache_key)
+        if method is None:
+            method = self._preview_method(doc)
+            if cache_key is not None:
+                self._method_cache[cache_key] = method
+        return method, doc
+    
+    def _preview_method(self, doc: fitz.Document) -> str:
+        """
+        Choose the extraction method from the first few pages
+        Table detection is costly, so it runs at most once, on the most ruled
+        preview page, and only when that page has enough ruled segments
         """
         try:
-            # Quick preview with pdfplumber to check text availability
-            with pdfplumber.open(pdf_path) as pdf:
-                # Check first few pages for text content
-                text_ratio = 0
-                preview_pages = min(len(pdf.pages), self.max_pages_preview)
+            # Check first few pages for text content and ruling
+            text_ratio = 0
+            best_page, best_rules = None, 0
+            preview_pages = min(len(doc), self.max_pages_preview)
+            
+            for i in range(preview_pages):
+                page = doc[i]
                 
-                for i in range(preview_pages):
-                    page = pdf.pages[i]
-                    text = page.extract_text()
-                    
-                    if text and len(text.strip()) > 50:
-                        text_ratio += 1
+                if len(page.get_text().strip()) > 50:
+                    text_ratio += 1
                 
-                text_ratio = text_ratio / preview_pages
+                rules = sum(1 for path in page.get_drawings()
+                            for item in path["items"] if item[0] in ("l", "re"))
+                if rules > best_rules:
+                    best_page, best_rules = page, rules
+            
+            text_ratio = text_ratio / preview_pages
+            
+            # Decision logic based on text availability
+            if text_ratio <= 0.3:
+                return "hybrid"      # Low text - need OCR or hybrid
+            if best_rules >= self.min_table_rules and best_page.find_tables().tables:
+                return "pdfplumber"  # Tabular layout - use pdfplumber
+            return "fitz"            # Spans come pre-grouped by font
                 
-                # Decision logic based on text availability
-                if text_ratio > 0.8:
-                    return "pdfplumber"  # High text content - use pdfplumber
-                elif text_ratio > 0.3:
-                    return "fitz"        # Mixed content - use fitz
-                else:
-                    return "hybrid"      # Low text - need OCR or hybrid
-                    
         except Exception:
             return "fitz"  # Safe fallback
     
-    def _extract_with_pdfplumber(self, pdf_path: str) -> Dict[str, Any]:
+    def _method_cache_key(self, source: PDFSource):
+        """Cache key for a path source's method decision; None for buffers"""
+        if not isinstance(source, (str, Path)):
+            return None
+        try:
+            stat = Path(source).stat()
+        except OSError:
+            return None
+        return str(source), stat.st_size, stat.st_mtime_ns
+    
+    def _extract_with_pdfplumber(self, source: PDFSource) -> Dict[str, Any]:
         """
         Extract using pdfplumber - best for text-heavy documents
         Provides precise positioning and formatting data
@@ -94,7 +196,7 @@ class PDFParser:
         }
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
+            with self._open_pdfplumber(source) as pdf:
                 document_data["total_pages"] = len(pdf.pages)
                 
                 # Extract title from metadata or first page
@@ -105,8 +207,8 @@ class PDFParser:
                     page_data = self._extract_page_pdfplumber(page, page_num)
                     document_data["pages"].append(page_data)
                     
-        except Exception as e:
-            self.logger.error(f"pdfplumber extraction failed: {e}")
+        except Exception:
+            _LOG.error("pdfplumber extraction failed", exc_info=True)
             return self._create_empty_document()
             
         return document_data
@@ -122,80 +224,42 @@ class PDFParser:
         }
         
         try:
-            # Extract characters with formatting details
-            chars = page.chars
-            page_data["raw_text"] = page.extract_text()
-            
-            # Group characters into text elements by font and position
-            text_elements = self._group_chars_into_elements(chars)
-            page_data["text_elements"] = text_elements
+            # pdfplumber merges same-font runs on a line in one pass; blanks are
+            # kept so a run is a phrase rather than a single word
+            words = page.extract_words(keep_blank_chars=True, extra_attrs=["fontname", "size"])
+            height = page.height
+            page_data["text_elements"] = [
+                # Bottom-left origin, as pdfplumber reports for chars; no style flags
+                (word["text"], word["fontname"], word["size"], 0,
+                 word["x0"], height - word["bottom"], word["x1"], height - word["top"])
+                for word in words
+            ]
+            page_data["raw_text"] = self._join_word_lines(words)
             
         except Exception as e:
-            self.logger.warning(f"Page {page_num} extraction partial failure: {e}")
+            _LOG.warning("Page %d extraction partial failure: %s", page_num, e)
             page_data["raw_text"] = page.extract_text() or ""
             
         return page_data
     
-    def _group_chars_into_elements(self, chars: List[Dict]) -> List[Dict[str, Any]]:
-        """
-        Group individual characters into text elements based on formatting
-        This is crucial for heading detection
-        """
-        if not chars:
-            return []
-            
-        elements = []
-        current_element = None
-        
-        for char in chars:
-            # Extract formatting attributes
-            font_info = {
-                "fontname": char.get("fontname", ""),
-                "size": char.get("size", 12),
-                "x0": char.get("x0", 0),
-                "y0": char.get("y0", 0),
-                "x1": char.get("x1", 0),
-                "y1": char.get("y1", 0)
-            }
-            
-            # Check if this character continues current element
-            if (current_element and 
-                self._same_formatting(current_element["font_info"], font_info) and
-                self._same_line(current_element["font_info"], font_info)):
-                
-                # Extend current element
-                current_element["text"] += char.get("text", "")
-                current_element["font_info"]["x1"] = font_info["x1"]
-                
-            else:
-                # Start new element
-                if current_element:
-                    elements.append(current_element)
-                    
-                current_element = {
-                    "text": char.get("text", ""),
-                    "font_info": font_info.copy()
-                }
-        
-        # Add final element
-        if current_element:
-            elements.append(current_element)
-            
-        return elements
-    
-    def _same_formatting(self, font1: Dict, font2: Dict) -> bool:
-        """Check if two font configurations are the same"""
-        return (font1["fontname"] == font2["fontname"] and 
-                abs(font1["size"] - font2["size"]) < 0.1)
+    @staticmethod
+    def _join_word_lines(words: List[Dict[str, Any]], tolerance: float = 3) -> str:
+        """Rebuild page text from words: spaces within a line, newlines between lines"""
+        lines = []
+        line_top = None
+        for word in words:
+            # extract_words yields words in reading order, one line after another
+            if line_top is None or abs(word["top"] - line_top) > tolerance:
+                lines.append([])
+                line_top = word["top"]
+            lines[-1].append(word["text"])
+        return "\n".join(" ".join(line) for line in lines)
     
-    def _same_line(self, font1: Dict, font2: Dict, tolerance: float = 2.0) -> bool:
-        """Check if two text elements are on the same line"""
-        return abs(font1["y0"] - font2["y0"]) < tolerance
-    
-    def _extract_with_fitz(self, pdf_path: str) -> Dict[str, Any]:
+    def _extract_with_fitz(self, source: PDFSource, doc: Optional[fitz.Document] = None) -> Dict[str, Any]:
         """
         Extract using PyMuPDF (fitz) - good for complex layouts
         Provides font details and handles various PDF formats
+        An already-open doc is reused and left open for its owner to close
         """
         document_data = {
             "title": "",
@@ -204,13 +268,14 @@ class PDFParser:
             "extraction_method": "fitz"
         }
         
+        owns_doc = doc is None
         try:
-            doc = fitz.open(pdf_path)
+            if owns_doc:
+                doc = self._open_fitz(source)
             document_data["total_pages"] = len(doc)
             
-            # Extract title from metadata
-            metadata = doc.metadata
-            document_data["title"] = metadata.get("title", "") or self._extract_title_from_first_page_fitz(doc)
+            # Extract title from metadata, else from the first page as it is parsed
+            title = doc.metadata.get("title", "")
             
             # Process each page
             for page_num in range(len(doc)):
@@ -218,14 +283,39 @@ class PDFParser:
                 page_data = self._extract_page_fitz(page, page_num + 1)
                 document_data["pages"].append(page_data)
                 
-            doc.close()
+                if page_num == 0 and not title:
+                    title = self._extract_title_from_text(page_data["raw_text"])
             
-        except Exception as e:
-            self.logger.error(f"fitz extraction failed: {e}")
+            document_data["title"] = title
+            
+        except Exception:
+            _LOG.error("fitz extraction failed", exc_info=True)
             return self._create_empty_document()
+        finally:
+            if owns_doc and doc is not None:
+                doc.close()
             
         return document_data
     
+    def extract_page_range(self, source: PDFSource, start: int, stop: int) -> List[Dict[str, Any]]:
+        """
+        Extract pages [start, stop) with fitz
+        Lets very large documents be split across worker processes
+        """
+        try:
+            doc = self._open_fitz(source)
+            try:
+                return [
+                    self._extract_page_fitz(doc[page_num], page_num + 1)
+                    for page_num in range(start, min(stop, len(doc)))
+                ]
+            finally:
+                doc.close()
+            
+        except Exception:
+            _LOG.error("fitz page range %d-%d extraction failed", start, stop, exc_info=True)
+            return []
+    
     def _extract_page_fitz(self, page, page_num: int) -> Dict[str, Any]:
         """Extract detailed information from a single page using fitz"""
         page_data = {
@@ -237,21 +327,27 @@ class PDFParser:
         }
         
         try:
-            # Get text with formatting details
-            blocks = page.get_text("dict")
-            page_data["raw_text"] = page.get_text()
+            # One text page feeds both outputs, so the content stream is parsed
+            # once; image blocks are never used, so they are not preserved
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            page_data["raw_text"] = page.get_text("text", textpage=textpage)
             
-            # Extract formatted text elements
-            text_elements = self._extract_fitz_text_elements(blocks)
-            page_data["text_elements"] = text_elements
+            # Blank or image-only page: no element could pass the 3-char
+            # heading filter, so skip building the span tree
+            if len(page_data["raw_text"].strip()) < 3:
+                return page_data
+            
+            # Get text with formatting details
+            blocks = page.get_text("dict", textpage=textpage)
+            page_data["text_elements"] = self._extract_fitz_text_elements(blocks)
             
         except Exception as e:
-            self.logger.warning(f"Page {page_num} fitz extraction error: {e}")
-            page_data["raw_text"] = page.get_text() or ""
+            # The page stays empty; re-parsing it with get_text() would hit the same content
+            _LOG.warning("Page %d fitz extraction error: %s", page_num, e)
             
         return page_data
     
-    def _extract_fitz_text_elements(self, blocks: Dict) -> List[Dict[str, Any]]:
+    def _extract_fitz_text_elements(self, blocks: Dict) -> List[Tuple]:
         """Extract text elements from fitz text blocks"""
         elements = []
         
@@ -260,22 +356,16 @@ class PDFParser:
                 continue
                 
             for line in block["lines"]:
-                for span in line.get("spans", []):
-                    element = {
-                        "text": span.get("text", ""),
-                        "font_info": {
-                            "fontname": span.get("font", ""),
-                            "size": span.get("size", 12),
-                            "flags": span.get("flags", 0),  # Bold, italic flags
-                            "x0": span.get("bbox", [0])[0] if span.get("bbox") else 0,
-                            "y0": span.get("bbox", [0, 0])[1] if span.get("bbox") else 0,
-                            "x1": span.get("bbox", [0, 0, 0])[2] if span.get("bbox") else 0,
-                            "y1": span.get("bbox", [0, 0, 0, 0])[3] if span.get("bbox") else 0
-                        }
-                    }
+                for span in line["spans"]:
+                    text = span["text"]
+                    if not text.strip():  # Only add non-empty elements
+                        continue
                     
-                    if element["text"].strip():  # Only add non-empty elements
-                        elements.append(element)
+                    # Spans always carry a 4-tuple bbox in "dict" output
+                    x0, y0, x1, y1 = span["bbox"]
+                    elements.append((text, span["font"], span["size"],
+                                     span["flags"],  # Bold, italic flags
+                                     x0, y0, x1, y1))
         
         return elements
     
@@ -288,38 +378,38 @@ class PDFParser:
         except:
             return ""
     
-    def _extract_title_from_first_page_fitz(self, doc) -> str:
-        """Fallback: extract likely title from first page"""
-        try:
-            if len(doc) > 0:
-                first_page = doc[0]
-                text = first_page.get_text()
-                
-                # Simple heuristic: first non-empty line might be title
-                lines = text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if line and len(line) > 5 and len(line) < 200:
-                        return line
-            return ""
-        except:
-            return ""
+    def _extract_title_from_text(self, text: str) -> str:
+        """Fallback: extract likely title from the first page's text"""
+        # Simple heuristic: first non-empty line might be title
+        for line in text.split('\n'):
+            line = line.strip()
+            if line and len(line) > 5 and len(line) < 200:
+                return line
+        return ""
     
-    def _extract_hybrid_approach(self, pdf_path: str) -> Dict[str, Any]:
+    def _extract_hybrid_approach(self, source: PDFSource, doc: Optional[fitz.Document] = None) -> Dict[str, Any]:
         """
         Hybrid approach: combine both libraries for maximum accuracy
         Used when document has mixed content or extraction challenges
         """
-        # Try pdfplumber first, fallback to fitz
-        result = self._extract_with_pdfplumber(pdf_path)
+        # Try fast fitz first; pdfplumber only gets a go when fitz found
+        # (almost) no text across the whole document
+        result = self._extract_with_fitz(source, doc)
         
-        if not result["pages"] or not any(page["raw_text"] for page in result["pages"]):
-            self.logger.info("Falling back to fitz extraction")
-            result = self._extract_with_fitz(pdf_path)
+        fitz_chars = self._total_text_length(result)
+        if fitz_chars < self.min_text_chars:
+            _LOG.info("Falling back to pdfplumber extraction")
+            fallback = self._extract_with_pdfplumber(source)
+            if self._total_text_length(fallback) > fitz_chars:
+                result = fallback
             
         result["extraction_method"] = "hybrid"
         return result
     
+    def _total_text_length(self, document_data: Dict[str, Any]) -> int:
+        """Characters of raw text across all extracted pages"""
+        return sum(len(page.get("raw_text") or "") for page in document_data.get("pages", []))
+    
     def _create_empty_document(self) -> Dict[str, Any]:
         """Create empty document structure for failed extractions"""
         return {
@@ -337,11 +427,5 @@ class PDFParser:
         if not document_data or not document_data.get("pages"):
             return False
             
-        # Check if any page has readable text 
-        total_text_length = 0
-        for page in document_data["pages"]:
-            total_text_length += len(page.get("raw_text", ""))
-            
         # Require minimum text content (adjust threshold as needed)
-        min_text_threshold = 100  # characters
-        return total_text_length >= min_text_threshold
+        return self._total_text_length(document_data) >= self.min_text_chars
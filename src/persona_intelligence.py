@@ -4,22 +4,197 @@ Extracts and ranks relevant sections based on user persona and job-to-be-done
 Optimized for diverse domains and multilingual content
 """
 
+import os
 import json
+import multiprocessing
 import time
+import hashlib
 import numpy as np
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Tuple, Callable
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.decomposition import TruncatedSVD
+from sklearn.metrics.pairwise import linear_kernel
 import re
 import math
 
+try:
+    import ahocorasick
+except ImportError:  # Optional automaton - keyword tests fall back to substring checks
+    ahocorasick = None
+
 # Import our existing components
-from src.pdf_parser import PDFParser
+from src.pdf_parser import PDFParser, pdf_digest
 from src.heading_detector import HeadingDetector
 from src.performance_optimizer import PerformanceOptimizer
+from src._cosine_numba import sparse_cosine, row_norms, query_cosine, section_scores
+
+# Text patterns, compiled once at import
+_WORD_RE = re.compile(r'\b[a-zA-Z]{4,}\b')  # Job keywords are longer than 3 letters
+_NUM_RE = re.compile(r'\d+\.?\d*%|\$\d+|\d+\.\d+')
+_WS_RE = re.compile(r'\s+')
+_SENT_SPLIT = re.compile(r'[.!?]+')
+
+# Words never used as job keywords
+_JOB_STOP_WORDS = frozenset({'the', 'and', 'for', 'are', 'with', 'this', 'that', 'from',
+                             'they', 'been', 'have', 'has'})
+
+# Sections and subsection chunks shorter than this are not scored
+_MIN_WORDS = 20
+
+# Heading level importance (H1 > H2 > H3)
+_LEVEL_CODES = {"H1": 1, "H2": 2, "H3": 3}  # Code 0: no heading or another level
+_LEVEL_WEIGHTS = np.array([0.0, 0.1, 0.05, 0.02])
+
+# Terms that mark a chunk as technical or definitional
+_QUALITY_TERMS = ('definition', 'method', 'result', 'analysis', 'conclusion')
+
+# Entries kept per engine cache before the oldest is evicted
+_CACHE_SIZE = 64
+
+def _iter_section_texts(document_contents: List[Dict[str, Any]]):
+    """((doc_idx, section_idx), content) for every section with non-blank content"""
+    for doc_idx, doc in enumerate(document_contents):
+        for section_idx, section in enumerate(doc.get("sections", [])):
+            content = section.get("content", "")
+            if content.strip():
+                yield (doc_idx, section_idx), content
+
+def _iter_viable_sections(document_contents: List[Dict[str, Any]]):
+    """
+    (doc_idx, section_idx, section, word_count) for every section worth scoring
+    Cheap length gates only - runs before any lowercasing or matching
+    """
+    for doc_idx, doc in enumerate(document_contents):
+        for section_idx, section in enumerate(doc.get("sections", [])):
+            content = section.get("content", "")
+            word_count = section.get("word_count")
+            if word_count is None:
+                word_count = len(content.split())
+            if word_count >= _MIN_WORDS and len(content) >= 50:
+                yield doc_idx, section_idx, section, word_count
+
+def _remember(cache: Dict[Any, Any], key: Any, value: Any):
+    """Store a cache entry, evicting the oldest one when the cache is full"""
+    if len(cache) >= _CACHE_SIZE:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+def _iter_sentences(para: str):
+    """Pieces of para between sentence punctuation, like _SENT_SPLIT.split without the list"""
+    start = 0
+    for match in _SENT_SPLIT.finditer(para):
+        yield para[start:match.start()]
+        start = match.end()
+    yield para[start:]
+
+# Worker startup costs seconds (each child imports sklearn), so small batches
+# parse serially; a pool pays off from this many documents or pages
+_POOL_MIN_DOCS = 8
+_POOL_MIN_PAGES = 200
+
+def _pool_context():
+    """
+    Context for extraction workers, forked from a clean server process instead
+    of the caller, so locks held by threads of earlier in-process parsing are
+    never inherited; the server imports this module once, so each fork starts warm
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()  # No fork - the default context spawns
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+# Per-worker engine, created once in each extraction child by _worker_init
+_worker_engine = None
+
+def _worker_init():
+    """Build the parser and detector once per worker process"""
+    global _worker_engine
+    _worker_engine = PersonaIntelligenceEngine()
+
+def _parse_one(pdf_path: str) -> Tuple[str, Any]:
+    """Worker entry point: (pdf_path, enhanced document or None)"""
+    return pdf_path, _worker_engine._parse_document(pdf_path)
+
+class _KeywordMatcher:
+    """
+    Counts how many distinct persona and job keywords occur in a lowercased text
+    One Aho-Corasick scan per text when pyahocorasick is installed
+    """
+    
+    def __init__(self, persona_keywords: List[str], job_keywords: List[str]):
+        self.persona_keywords = persona_keywords
+        self.job_keywords = job_keywords
+        
+        self._automaton = None
+        keywords = set(persona_keywords) | set(job_keywords)
+        if ahocorasick is not None and keywords:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+    
+    def count(self, text_lower: str) -> Tuple[int, int]:
+        """(persona keyword hits, job keyword hits), each keyword counted once"""
+        if self._automaton is None:
+            return (sum(1 for kw in self.persona_keywords if kw in text_lower),
+                    sum(1 for kw in self.job_keywords if kw in text_lower))
+        
+        found = {keyword for _, keyword in self._automaton.iter(text_lower)}
+        return (sum(1 for kw in self.persona_keywords if kw in found),
+                sum(1 for kw in self.job_keywords if kw in found))
+
+class _CategoryVoter:
+    """
+    Votes a lowercased text into a category by counting distinct keyword hits
+    Categories of one kind are listed in priority order; ties go to the earlier one
+    """
+    
+    def __init__(self, tables: Dict[str, Dict[str, List[str]]]):
+        # keyword -> [(kind, category), ...]; a keyword may vote for several
+        self._owners = defaultdict(list)
+        self._priority = {}
+        self._ranked = {kind: list(categories) for kind, categories in tables.items()}
+        for kind, categories in tables.items():
+            for rank, (category, keywords) in enumerate(categories.items()):
+                self._priority[(kind, category)] = rank
+                for keyword in dict.fromkeys(keywords):
+                    self._owners[keyword].append((kind, category))
+        
+        self._automaton = None
+        if ahocorasick is not None and self._owners:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._owners:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+    
+    def _found(self, text_lower: str) -> set:
+        """Keywords occurring in the text"""
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text_lower)}
+        return {keyword for keyword in self._owners if keyword in text_lower}
+    
+    def vote(self, text_lower: str, kind: str) -> Any:
+        """Winning category of the given kind, or None when no keyword matches"""
+        found = self._found(text_lower)
+        votes = Counter(category for keyword in found
+                        for owner_kind, category in self._owners[keyword]
+                        if owner_kind == kind)
+        if not votes:
+            return None
+        return max(votes, key=lambda category: (votes[category], -self._priority[(kind, category)]))
+    
+    def first_match(self, text_lower: str, kind: str) -> Any:
+        """Highest-priority category of the given kind with any keyword in the text"""
+        found = self._found(text_lower)
+        hits = [self._priority[owner] for keyword in found
+                for owner in self._owners[keyword] if owner[0] == kind]
+        if not hits:
+            return None
+        return self._ranked[kind][min(hits)]
 
 class PersonaIntelligenceEngine:
     """
@@ -39,7 +214,19 @@ class PersonaIntelligenceEngine:
         
         # Lightweight semantic models (under 1GB constraint)
         self.tfidf_vectorizer = None
-        self.svd_reducer = None
+        
+        # Section TF-IDF rows, built once per collection and scored in one product
+        self.section_tfidf = None
+        self.section_rows = {}  # (doc_idx, section_idx) -> row in section_tfidf
+        self.section_csc = None  # Column-major copy gathered by the numba cosine kernel
+        self.section_norms = None  # Row norms for the numba cosine kernel
+        self.query_vector = None
+        
+        # Repeat-call caches: parsed documents by PDF digest, fitted models by
+        # corpus digest, and ranked results by (documents, persona, job)
+        self._document_cache = {}
+        self._model_cache = {}
+        self._result_cache = {}
         
         # Domain-specific keywords for persona matching
         self.persona_keywords = {
@@ -51,6 +238,28 @@ class PersonaIntelligenceEngine:
             'manager': ['strategy', 'planning', 'decision', 'team', 'process', 'outcome', 'objective']
         }
         
+        # Role indicators, consulted when no persona keyword matches
+        self.role_indicators = {
+            'researcher': ['phd', 'research', 'scientist'],
+            'student': ['student', 'undergraduate', 'graduate'],
+            'analyst': ['analyst', 'investment', 'financial']
+        }
+        
+        # Job type keywords, in priority order
+        self.job_type_keywords = {
+            'literature_review': ['literature review', 'review', 'survey'],
+            'exam_preparation': ['exam', 'study', 'preparation', 'learn'],
+            'financial_analysis': ['financial', 'revenue', 'analyze'],
+            'technical_review': ['technical', 'implementation', 'system']
+        }
+        
+        # One keyword automaton for persona, role and job typing
+        self.category_voter = _CategoryVoter({
+            'persona': self.persona_keywords,
+            'role': self.role_indicators,
+            'job': self.job_type_keywords
+        })
+        
         # Job-specific importance weights
         self.job_weights = {
             'literature_review': {'methodology': 0.3, 'results': 0.25, 'discussion': 0.2, 'conclusion': 0.15},
@@ -77,29 +286,42 @@ class PersonaIntelligenceEngine:
         start_time = time.time()
         
         try:
-            # Step 1: Extract structured content from all documents
-            print(f"📚 Extracting content from {len(pdf_paths)} documents...")
-            document_contents = self._extract_all_documents(pdf_paths)
-            
-            # Step 2: Build semantic understanding models
-            print("🧠 Building semantic models...")
-            self._build_semantic_models(document_contents)
+            digests = [pdf_digest(path) for path in pdf_paths]
+            result_key = None
+            if None not in digests:
+                result_key = (tuple(zip(pdf_paths, digests)), persona, job_to_be_done)
             
-            # Step 3: Analyze persona and job requirements
-            print("👤 Analyzing persona requirements...")
-            persona_profile = self._analyze_persona(persona, job_to_be_done)
-            
-            # Step 4: Extract and rank relevant sections
-            print("🎯 Extracting relevant sections...")
-            extracted_sections = self._extract_relevant_sections(
-                document_contents, persona_profile
-            )
-            
-            # Step 5: Perform subsection analysis
-            print("🔍 Analyzing subsections...")
-            subsection_analysis = self._analyze_subsections(
-                document_contents, extracted_sections, persona_profile
-            )
+            cached = self._result_cache.get(result_key)
+            if cached is not None:
+                print("♻️ Reusing cached analysis for unchanged documents...")
+                extracted_sections, subsection_analysis = cached
+            else:
+                # Step 1: Extract structured content from all documents
+                print(f"📚 Extracting content from {len(pdf_paths)} documents...")
+                document_contents = self._extract_all_documents(pdf_paths, digests)
+                
+                # Step 2: Build semantic understanding models
+                print("🧠 Building semantic models...")
+                self._build_semantic_models(document_contents)
+                
+                # Step 3: Analyze persona and job requirements
+                print("👤 Analyzing persona requirements...")
+                persona_profile = self._analyze_persona(persona, job_to_be_done)
+                
+                # Step 4: Extract and rank relevant sections
+                print("🎯 Extracting relevant sections...")
+                extracted_sections = self._extract_relevant_sections(
+                    document_contents, persona_profile
+                )
+                
+                # Step 5: Perform subsection analysis
+                print("🔍 Analyzing subsections...")
+                subsection_analysis = self._analyze_subsections(
+                    document_contents, extracted_sections, persona_profile
+                )
+                
+                if result_key is not None:
+                    _remember(self._result_cache, result_key, (extracted_sections, subsection_analysis))
             
             # Step 6: Format output
             result = self._format_output(
@@ -116,68 +338,136 @@ class PersonaIntelligenceEngine:
             print(f"❌ Analysis failed: {e}")
             return self._create_fallback_result(pdf_paths, persona, job_to_be_done)
     
-    def _extract_all_documents(self, pdf_paths: List[str]) -> List[Dict[str, Any]]:
-        """Extract structured content from all PDF documents"""
+    def _extract_all_documents(self, pdf_paths: List[str],
+                               digests: List[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Extract structured content from all PDF documents
+        digests are the PDFs' content digests; documents seen before are not re-parsed
+        """
         document_contents = []
+        digests = digests or [None] * len(pdf_paths)
         
-        for pdf_path in pdf_paths:
-            try:
-                # Use existing PDF parser
-                document_data = self.pdf_parser.extract_text_with_formatting(pdf_path)
-                
-                # Get document outline
-                title, headings = self.heading_detector.identify_headings(document_data)
-                
-                # Enhance with semantic sections
-                enhanced_doc = self._enhance_document_structure(
-                    pdf_path, document_data, title, headings
-                )
-                
-                document_contents.append(enhanced_doc)
-                
-            except Exception as e:
-                print(f"⚠️ Failed to extract {pdf_path}: {e}")
+        # Parse every uncached document up front, in parallel when there are several
+        pending = [path for path, digest in zip(pdf_paths, digests)
+                   if digest not in self._document_cache]
+        parsed = dict(self._parse_documents(pending))
+        
+        for pdf_path, digest in zip(pdf_paths, digests):
+            cached = self._document_cache.get(digest)
+            if cached is not None:
+                document_contents.append(dict(cached, filepath=pdf_path))
+                continue
+            
+            enhanced_doc = parsed.get(pdf_path)
+            if enhanced_doc is None:
                 continue
+            
+            document_contents.append(enhanced_doc)
+            if digest is not None:
+                _remember(self._document_cache, digest, enhanced_doc)
         
         return document_contents
     
+    def _parse_documents(self, pdf_paths: List[str]) -> List[Tuple[str, Any]]:
+        """(pdf_path, enhanced document or None) per path, one worker process per CPU"""
+        max_workers = min(len(pdf_paths), os.cpu_count() or 1)
+        if max_workers < 2 or not self._worth_pooling(pdf_paths):
+            return [(pdf_path, self._parse_document(pdf_path)) for pdf_path in pdf_paths]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=_pool_context(),
+                                     initializer=_worker_init) as executor:
+                return list(executor.map(_parse_one, pdf_paths, chunksize=1))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"⚠️ Parallel extraction unavailable ({e}), extracting serially")
+            return [(pdf_path, self._parse_document(pdf_path)) for pdf_path in pdf_paths]
+    
+    def _worth_pooling(self, pdf_paths: List[str]) -> bool:
+        """Whether the batch is big enough to repay worker startup"""
+        if len(pdf_paths) >= _POOL_MIN_DOCS:
+            return True
+        # Page counts come from lazy opens that read only the xref
+        pages = sum(self.performance_optimizer._page_count(path) for path in pdf_paths)
+        return pages >= _POOL_MIN_PAGES
+    
+    def _parse_document(self, pdf_path: str) -> Any:
+        """Parse, outline and section one PDF; None when it cannot be extracted"""
+        try:
+            # Use existing PDF parser
+            document_data = self.pdf_parser.extract_text_with_formatting(pdf_path)
+            
+            # Get document outline
+            title, headings = self.heading_detector.identify_headings(document_data)
+            
+            # Enhance with semantic sections
+            return self._enhance_document_structure(
+                pdf_path, document_data, title, headings
+            )
+            
+        except Exception as e:
+            print(f"⚠️ Failed to extract {pdf_path}: {e}")
+            return None
+    
     def _enhance_document_structure(self, pdf_path: str, document_data: Dict[str, Any], 
                                   title: str, headings: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Enhance document with semantic section analysis"""
         
-        # Extract full text by sections
+        # Bucket headings by page once instead of filtering them per page
+        headings_by_page = defaultdict(list)
+        for heading in headings:
+            headings_by_page[heading["page"]].append(heading)
+        
+        # Extract full text by sections; page texts are collected per section
+        # and joined once when it closes
         sections = []
-        current_section = {"heading": None, "content": "", "page_start": 1, "page_end": 1}
+        current_heading = None
+        current_parts = [""]
+        current_has_text = False
+        page_start = page_end = 1
         
         for page in document_data.get("pages", []):
             page_num = page.get("page_number", 1)
             page_text = page.get("raw_text", "")
             
             # Find headings on this page
-            page_headings = [h for h in headings if h["page"] == page_num]
+            page_headings = headings_by_page.get(page_num)
             
             if page_headings:
                 # Save current section
-                if current_section["content"].strip():
-                    current_section["page_end"] = page_num - 1
-                    sections.append(current_section.copy())
+                if current_has_text:
+                    sections.append({
+                        "heading": current_heading,
+                        "content": "\n".join(current_parts),
+                        "page_start": page_start,
+                        "page_end": page_num - 1
+                    })
                 
-                # Start new section
-                for heading in page_headings:
-                    current_section = {
-                        "heading": heading,
-                        "content": page_text,
-                        "page_start": page_num,
-                        "page_end": page_num
-                    }
+                # Start new section (the page's last heading owns it)
+                current_heading = page_headings[-1]
+                current_parts = [page_text]
+                current_has_text = bool(page_text.strip())
+                page_start = page_end = page_num
             else:
                 # Continue current section
-                current_section["content"] += "\n" + page_text
-                current_section["page_end"] = page_num
+                current_parts.append(page_text)
+                current_has_text = current_has_text or bool(page_text.strip())
+                page_end = page_num
         
         # Add final section
-        if current_section["content"].strip():
-            sections.append(current_section)
+        if current_has_text:
+            sections.append({
+                "heading": current_heading,
+                "content": "\n".join(current_parts),
+                "page_start": page_start,
+                "page_end": page_end
+            })
+        
+        # Word counts are needed by every scoring pass - count once here; the
+        # text is lowercased only transiently while it is scored, so sections
+        # (cached and shipped back from extraction workers) hold one copy
+        for section in sections:
+            section["word_count"] = len(section["content"].split())
         
         return {
             "filepath": pdf_path,
@@ -185,21 +475,33 @@ class PersonaIntelligenceEngine:
             "headings": headings,
             "sections": sections,
             "total_pages": document_data.get("total_pages", 0),
-            "word_count": sum(len(s["content"].split()) for s in sections)
+            "word_count": sum(s["word_count"] for s in sections)
         }
     
     def _build_semantic_models(self, document_contents: List[Dict[str, Any]]):
         """Build lightweight semantic models for similarity analysis"""
         
-        # Collect all text content
-        all_texts = []
-        for doc in document_contents:
-            for section in doc.get("sections", []):
-                content = section.get("content", "")
-                if content.strip():
-                    all_texts.append(content)
+        # One pass over the sections: remember which section owns each row and
+        # digest the corpus incrementally, so no joined copy is ever built
+        self.section_rows = {}
+        corpus_digest = hashlib.blake2b(digest_size=16)
+        for key, content in _iter_section_texts(document_contents):
+            if self.section_rows:
+                corpus_digest.update(b"\0")
+            corpus_digest.update(content.encode())
+            self.section_rows[key] = len(self.section_rows)
+        
+        n_texts = len(self.section_rows)
+        if not n_texts:
+            return
         
-        if not all_texts:
+        # A corpus seen before reuses its fitted models instead of refitting
+        corpus_key = corpus_digest.digest()
+        cached = self._model_cache.get(corpus_key)
+        if cached is not None:
+            (self.tfidf_vectorizer, self.section_tfidf, self.section_csc,
+             self.section_norms) = cached
+            print(f"♻️ Reusing semantic model: {n_texts} texts, {self.section_tfidf.shape[1]} features")
             return
         
         try:
@@ -212,20 +514,28 @@ class PersonaIntelligenceEngine:
                 min_df=2
             )
             
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(all_texts)
+            # Sections are streamed straight from the documents
+            tfidf_matrix = self.tfidf_vectorizer.fit_transform(
+                content for _, content in _iter_section_texts(document_contents)
+            )
+            self.section_tfidf = tfidf_matrix  # Kept for section scoring
+            if sparse_cosine is not None:
+                self.section_csc = tfidf_matrix.tocsc()
+                self.section_norms = row_norms(tfidf_matrix)
             
-            # Dimensionality reduction for efficiency
-            if tfidf_matrix.shape[1] > 500:
-                self.svd_reducer = TruncatedSVD(n_components=300, random_state=42)
-                self.reduced_embeddings = self.svd_reducer.fit_transform(tfidf_matrix)
-            else:
-                self.reduced_embeddings = tfidf_matrix.toarray()
+            # Scoring reads the TF-IDF rows directly; no reduced embedding is built
+            print(f"🔧 Built semantic model: {n_texts} texts, {tfidf_matrix.shape[1]} features")
             
-            print(f"🔧 Built semantic model: {len(all_texts)} texts, {self.reduced_embeddings.shape[1]} features")
+            _remember(self._model_cache, corpus_key, (
+                self.tfidf_vectorizer, self.section_tfidf, self.section_csc,
+                self.section_norms
+            ))
             
         except Exception as e:
             print(f"⚠️ Semantic model building failed: {e}")
             self.tfidf_vectorizer = None
+            self.section_tfidf = None
+            self.section_csc = None
     
     def _analyze_persona(self, persona: str, job_to_be_done: str) -> Dict[str, Any]:
         """Analyze persona and job to create relevance profile"""
@@ -243,88 +553,114 @@ class PersonaIntelligenceEngine:
         # Combine for query vector
         query_text = f"{persona} {job_to_be_done}"
         
+        # Transform the query once for the whole collection
+        self.query_vector = None
+        if self.tfidf_vectorizer is not None:
+            try:
+                self.query_vector = self.tfidf_vectorizer.transform([query_text])
+            except Exception:
+                pass  # Similarity is skipped without a query vector
+        
         profile = {
             "persona_type": persona_type,
             "job_type": job_type,
             "persona_keywords": persona_keywords,
             "job_keywords": job_keywords,
             "query_text": query_text,
-            "importance_weights": self.job_weights.get(job_type, {})
+            "importance_weights": self.job_weights.get(job_type, {}),
+            "keyword_matcher": _KeywordMatcher(persona_keywords, job_keywords)
         }
         
         return profile
     
     def _identify_persona_type(self, persona_text: str) -> str:
-        """Identify persona type from description"""
-        for persona_type, keywords in self.persona_keywords.items():
-            if any(keyword in persona_text for keyword in keywords[:3]):  # Check top 3 keywords
-                return persona_type
-        
-        # Fallback: look for common role indicators
-        if any(word in persona_text for word in ['phd', 'research', 'scientist']):
-            return 'researcher'
-        elif any(word in persona_text for word in ['student', 'undergraduate', 'graduate']):
-            return 'student'
-        elif any(word in persona_text for word in ['analyst', 'investment', 'financial']):
-            return 'analyst'
-        else:
-            return 'general'
+        """Identify persona type from description by keyword vote"""
+        return (self.category_voter.vote(persona_text, 'persona')
+                or self.category_voter.vote(persona_text, 'role')
+                or 'general')
     
     def _identify_job_type(self, job_text: str) -> str:
-        """Identify job type from description"""
-        if any(word in job_text for word in ['literature review', 'review', 'survey']):
-            return 'literature_review'
-        elif any(word in job_text for word in ['exam', 'study', 'preparation', 'learn']):
-            return 'exam_preparation'
-        elif any(word in job_text for word in ['financial', 'revenue', 'analyze']):
-            return 'financial_analysis'
-        elif any(word in job_text for word in ['technical', 'implementation', 'system']):
-            return 'technical_review'
-        else:
-            return 'general_analysis'
+        """Identify job type from description: first job type, in priority order, with a keyword match"""
+        return self.category_voter.first_match(job_text, 'job') or 'general_analysis'
     
     def _extract_job_keywords(self, job_text: str) -> List[str]:
         """Extract important keywords from job description"""
-        # Simple keyword extraction
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', job_text.lower())
-        
-        # Filter stop words and extract meaningful terms
-        stop_words = {'the', 'and', 'for', 'are', 'with', 'this', 'that', 'from', 'they', 'been', 'have', 'has'}
-        keywords = [word for word in words if word not in stop_words and len(word) > 3]
-        
-        # Return top keywords by frequency
-        return list(Counter(keywords).keys())[:10]
+        # Simple keyword extraction: count meaningful terms in one scan
+        counts = {}
+        for match in _WORD_RE.finditer(job_text.lower()):
+            word = match.group()
+            if word not in _JOB_STOP_WORDS:
+                counts[word] = counts.get(word, 0) + 1
+        
+        # Return top keywords by frequency (ties keep first-mention order)
+        return sorted(counts, key=counts.get, reverse=True)[:10]
     
     def _extract_relevant_sections(self, document_contents: List[Dict[str, Any]], 
                                  persona_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Extract and rank sections based on persona relevance"""
         
-        scored_sections = []
-        
-        for doc in document_contents:
-            doc_name = doc.get("filepath", "").split('/')[-1]
+        # Semantic similarity of every section at once: the compiled sparse
+        # kernel when numba is available, else the linear kernel (TF-IDF rows
+        # are L2-normalized, so it equals the cosine similarity)
+        similarities = None
+        if self.query_vector is not None and self.section_tfidf is not None:
+            if self.section_csc is not None:
+                similarities = query_cosine(self.query_vector, self.section_csc, self.section_norms)
+            else:
+                similarities = linear_kernel(self.query_vector, self.section_tfidf).ravel()
+        
+        # Gather the scoring inputs of every candidate section, then score them together
+        matcher = persona_profile["keyword_matcher"]
+        candidates = []
+        persona_hits = []
+        job_hits = []
+        section_sims = []
+        level_codes = []
+        word_counts = []
+        
+        doc_names = [doc.get("filepath", "").split('/')[-1] for doc in document_contents]
+        
+        for doc_idx, section_idx, section, word_count in _iter_viable_sections(document_contents):
+            heading = section.get("heading")
+            candidates.append((doc_names[doc_idx], section, heading))
             
-            for section in doc.get("sections", []):
-                heading = section.get("heading")
-                content = section.get("content", "")
-                
-                if not content.strip() or len(content) < 50:
-                    continue
-                
-                # Calculate relevance score
-                relevance_score = self._calculate_section_relevance(
-                    content, heading, persona_profile
-                )
-                
-                if relevance_score > 0.1:  # Threshold for inclusion
-                    scored_sections.append({
-                        "document": doc_name,
-                        "page": section.get("page_start", 1),
-                        "section_title": heading.get("text", "Untitled") if heading else "Content Section",
-                        "relevance_score": relevance_score,
-                        "content": content,
-                        "heading_level": heading.get("level", "H1") if heading else "H1"
-                    })
+            # Keyword matching
+            persona_matches, job_matches = matcher.count(section["content"].lower())
+            persona_hits.append(persona_matches)
+            job_hits.append(job_matches)
+            
+            # Semantic similarity (if models available)
+            row = self.section_rows.get((doc_idx, section_idx))
+            section_sims.append(similarities[row] if similarities is not None and row is not None else 0.0)
+            
+            # Heading level importance (H1 > H2 > H3)
+            level_codes.append(_LEVEL_CODES.get(heading.get("level", "H1"), 0) if heading else 0)
+            
+            word_counts.append(word_count)
+        
+        if not candidates:
+            return []
+        
+        relevance_scores = section_scores(
+            np.array(persona_hits, dtype=np.int64), np.array(job_hits, dtype=np.int64),
+            max(len(persona_profile["persona_keywords"]), 1),
+            max(len(persona_profile["job_keywords"]), 1),
+            np.array(section_sims, dtype=np.float64),
+            np.array(level_codes, dtype=np.intp), _LEVEL_WEIGHTS,
+            np.array(word_counts, dtype=np.int64)
+        )
+        
+        scored_sections = []
+        for idx in np.flatnonzero(relevance_scores > 0.1):  # Threshold for inclusion
+            doc_name, section, heading = candidates[idx]
+            scored_sections.append({
+                "document": doc_name,
+                "page": section.get("page_start", 1),
+                "section_title": heading.get("text", "Untitled") if heading else "Content Section",
+                "relevance_score": float(relevance_scores[idx]),
+                "content": section.get("content", ""),
+                "heading_level": heading.get("level", "H1") if heading else "H1"
+            })
         
         # Sort by relevance score and assign importance ranks
         scored_sections.sort(key=lambda x: x["relevance_score"], reverse=True)
@@ -336,78 +672,43 @@ class PersonaIntelligenceEngine:
         # Return top sections (limit for output size)
         return scored_sections[:20]
     
-    def _calculate_section_relevance(self, content: str, heading: Dict[str, Any], 
-                                   persona_profile: Dict[str, Any]) -> float:
-        """Calculate relevance score for a section"""
-        score = 0.0
-        
-        # Keyword matching score
-        content_lower = content.lower()
-        
-        # Persona keywords
-        persona_matches = sum(1 for kw in persona_profile["persona_keywords"] if kw in content_lower)
-        score += (persona_matches / max(len(persona_profile["persona_keywords"]), 1)) * 0.3
-        
-        # Job keywords
-        job_matches = sum(1 for kw in persona_profile["job_keywords"] if kw in content_lower)
-        score += (job_matches / max(len(persona_profile["job_keywords"]), 1)) * 0.4
-        
-        # Semantic similarity (if models available)
-        if self.tfidf_vectorizer is not None:
-            try:
-                query_vector = self.tfidf_vectorizer.transform([persona_profile["query_text"]])
-                content_vector = self.tfidf_vectorizer.transform([content])
-                
-                similarity = cosine_similarity(query_vector, content_vector)[0][0]
-                score += similarity * 0.3
-                
-            except Exception:
-                pass  # Skip if similarity calculation fails
-        
-        # Heading level importance (H1 > H2 > H3)
-        if heading:
-            level = heading.get("level", "H1")
-            level_weights = {"H1": 0.1, "H2": 0.05, "H3": 0.02}
-            score += level_weights.get(level, 0)
-        
-        # Content length factor (prefer substantial sections)
-        word_count = len(content.split())
-        if 100 <= word_count <= 1000:
-            score += 0.05
-        elif word_count > 1000:
-            score += 0.02  # Slight penalty for very long sections
-        
-        return min(score, 1.0)
-    
     def _analyze_subsections(self, document_contents: List[Dict[str, Any]], 
                            extracted_sections: List[Dict[str, Any]], 
-                           persona_profile: Dict[str, Any]]) -> List[Dict[str, Any]]:
+                           persona_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Perform granular subsection analysis"""
         
-        subsection_analysis = []
-        
-        for section in extracted_sections[:10]:  # Analyze top 10 sections
-            content = section.get("content", "")
-            
+        # Collect the chunks of the top 10 sections, then score them all at once
+        chunk_sections = []
+        chunk_texts = []
+        chunk_lowers = []
+        chunk_words = []
+        for section in extracted_sections[:10]:
             # Split content into meaningful chunks (paragraphs/sentences)
-            chunks = self._split_content_into_chunks(content)
-            
-            for chunk in chunks:
-                if len(chunk.split()) < 20:  # Skip very short chunks
+            for chunk in self._split_content_into_chunks(section.get("content", "")):
+                word_count = len(chunk.split())
+                if word_count < _MIN_WORDS:  # Skip very short chunks
                     continue
                 
-                # Calculate chunk relevance
-                chunk_score = self._calculate_chunk_relevance(chunk, persona_profile)
-                
-                if chunk_score > 0.2:  # Threshold for inclusion
-                    refined_text = self._refine_text_chunk(chunk, persona_profile)
-                    
-                    subsection_analysis.append({
-                        "document": section["document"],
-                        "page": section["page"],
-                        "refined_text": refined_text,
-                        "relevance_score": chunk_score
-                    })
+                chunk_sections.append(section)
+                chunk_texts.append(chunk)
+                chunk_lowers.append(chunk.lower())
+                chunk_words.append(word_count)
+        
+        if not chunk_texts:
+            return []
+        
+        chunk_scores = self._score_chunks(chunk_texts, chunk_lowers, np.array(chunk_words),
+                                          persona_profile)
+        
+        subsection_analysis = []
+        for idx in np.flatnonzero(chunk_scores > 0.2):  # Threshold for inclusion
+            section = chunk_sections[idx]
+            subsection_analysis.append({
+                "document": section["document"],
+                "page": section["page"],
+                "refined_text": self._refine_text_chunk(chunk_texts[idx], persona_profile),
+                "relevance_score": float(chunk_scores[idx])
+            })
         
         # Sort by relevance and limit output
         subsection_analysis.sort(key=lambda x: x["relevance_score"], reverse=True)
@@ -426,20 +727,23 @@ class PersonaIntelligenceEngine:
                 
             # If paragraph is very long, split by sentences
             if len(para.split()) > 150:
-                sentences = re.split(r'[.!?]+', para)
                 current_chunk = ""
+                current_words = 0
                 
-                for sentence in sentences:
+                for sentence in _iter_sentences(para):
                     sentence = sentence.strip()
                     if not sentence:
                         continue
-                        
-                    if len((current_chunk + " " + sentence).split()) <= 100:
+                    
+                    sentence_words = len(sentence.split())
+                    if current_words + sentence_words <= 100:
                         current_chunk += " " + sentence
+                        current_words += sentence_words
                     else:
                         if current_chunk:
                             chunks.append(current_chunk.strip())
                         current_chunk = sentence
+                        current_words = sentence_words
                 
                 if current_chunk:
                     chunks.append(current_chunk.strip())
@@ -448,33 +752,31 @@ class PersonaIntelligenceEngine:
         
         return chunks
     
-    def _calculate_chunk_relevance(self, chunk: str, persona_profile: Dict[str, Any]) -> float:
-        """Calculate relevance score for a text chunk"""
-        chunk_lower = chunk.lower()
+    def _score_chunks(self, chunks: List[str], chunks_lower: List[str], word_counts: np.ndarray,
+                      persona_profile: Dict[str, Any]) -> np.ndarray:
+        """Relevance score of every text chunk, as one array"""
+        matcher = persona_profile["keyword_matcher"]
+        n_chunks = len(chunks)
         
         # Keyword density scoring
-        persona_matches = sum(1 for kw in persona_profile["persona_keywords"] if kw in chunk_lower)
-        job_matches = sum(1 for kw in persona_profile["job_keywords"] if kw in chunk_lower)
-        
-        keyword_density = (persona_matches + job_matches) / len(chunk.split())
-        
-        # Content quality indicators
-        quality_score = 0.0
-        
-        # Prefer chunks with numbers, data, specific information
-        if re.search(r'\d+\.?\d*%|\$\d+|\d+\.\d+', chunk):
-            quality_score += 0.1
-        
-        # Prefer chunks with technical terms or definitions
-        if any(indicator in chunk_lower for indicator in ['definition', 'method', 'result', 'analysis', 'conclusion']):
-            quality_score += 0.1
+        keyword_hits = np.fromiter((sum(matcher.count(text)) for text in chunks_lower),
+                                   dtype=np.float64, count=n_chunks)
+        keyword_density = keyword_hits / word_counts
+        
+        # Content quality indicators: chunks with numbers, data, specific
+        # information, and chunks with technical terms or definitions
+        has_numbers = np.fromiter((_NUM_RE.search(chunk) is not None for chunk in chunks),
+                                  dtype=bool, count=n_chunks)
+        has_terms = np.fromiter((any(term in text for term in _QUALITY_TERMS) for text in chunks_lower),
+                                dtype=bool, count=n_chunks)
+        quality_score = has_numbers * 0.1 + has_terms * 0.1
         
         return keyword_density * 0.8 + quality_score
     
     def _refine_text_chunk(self, chunk: str, persona_profile: Dict[str, Any]) -> str:
         """Refine and clean text chunk for output"""
         # Clean up whitespace and formatting
-        refined = re.sub(r'\s+', ' ', chunk).strip()
+        refined = _WS_RE.sub(' ', chunk).strip()
         
         # Limit length for output
         if len(refined) > 500:
@@ -0,0 +1,59 @@
+"""
+Keyword voting for persona and job types
+"""
+
+import pytest
+
+from src import persona_intelligence
+from src.persona_intelligence import PersonaIntelligenceEngine, _CategoryVoter
+
+TABLES = {
+    "persona": {
+        "researcher": ["research", "analysis", "study"],
+        "student": ["study", "exam", "course"],
+        "analyst": ["analysis", "market", "trend"],
+    },
+    "job": {
+        "literature_review": ["review", "literature"],
+        "exam_preparation": ["exam", "prepare"],
+    },
+}
+
+@pytest.fixture(params=[True, False], ids=["automaton", "substring"])
+def voter(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(persona_intelligence, "ahocorasick", None)
+    elif persona_intelligence.ahocorasick is None:
+        pytest.skip("pyahocorasick not installed")
+    return _CategoryVoter(TABLES)
+
+def test_vote_picks_most_keyword_hits(voter):
+    assert voter.vote("an exam course to study for", "persona") == "student"
+
+def test_vote_tie_goes_to_earlier_category(voter):
+    # "study" votes researcher and student; "market" analyst, "exam" student
+    assert voter.vote("a study", "persona") == "researcher"
+    assert voter.vote("market exam", "persona") == "student"
+
+def test_vote_counts_distinct_keywords_only(voter):
+    assert voter.vote("market market market, exam course", "persona") == "student"
+
+def test_vote_none_without_match(voter):
+    assert voter.vote("nothing relevant here", "persona") is None
+
+def test_first_match_ignores_hit_counts(voter):
+    # More exam keywords, but literature_review is listed first
+    assert voter.first_match("prepare for the exam with a review", "job") == "literature_review"
+    assert voter.first_match("prepare for the exam", "job") == "exam_preparation"
+    assert voter.first_match("nothing relevant here", "job") is None
+
+def test_engine_job_type_keeps_priority_order():
+    engine = PersonaIntelligenceEngine()
+    # Three exam_preparation keywords against one literature_review keyword
+    assert engine._identify_job_type("review to study and learn for exam preparation") == "literature_review"
+    assert engine._identify_job_type("nothing relevant here") == "general_analysis"
+
+def test_engine_persona_falls_back_to_role_then_general():
+    engine = PersonaIntelligenceEngine()
+    assert engine._identify_persona_type("phd scientist") == "researcher"
+    assert engine._identify_persona_type("nothing relevant here") == "general"
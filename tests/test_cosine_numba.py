@@ -0,0 +1,103 @@
+"""
+Numba scoring kernels against their sklearn / NumPy references
+"""
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity, linear_kernel
+
+from src import _cosine_numba
+from src._cosine_numba import (_sparse_cosine_kernel, _section_scores_kernel,
+                               row_norms, query_cosine, section_scores)
+
+SECTIONS = [
+    "Trip planning for a group of college friends in the south of France",
+    "Coastal adventures: beaches, water sports and nightlife along the coast",
+    "Culinary experiences and cooking classes in Provence",
+    "Packing tips and travel checklists",
+    "",  # Empty section - zero row, zero norm
+    "Budget hotels and hostels for groups of friends",
+]
+QUERY = "Travel Planner: plan a trip of 4 days for a group of 10 college friends"
+
+def _tfidf(norm="l2"):
+    """Section matrix (CSR) and query row from one small fitted vocabulary"""
+    vectorizer = TfidfVectorizer(norm=norm)
+    matrix = vectorizer.fit_transform(SECTIONS)
+    return matrix, vectorizer.transform([QUERY])
+
+def _reference(matrix, query) -> np.ndarray:
+    return cosine_similarity(query, matrix).ravel()
+
+@pytest.mark.parametrize("norm", ["l2", None])
+def test_python_cosine_kernel_matches_sklearn(norm):
+    matrix, query = _tfidf(norm)
+    csc = matrix.tocsc()
+    out = np.empty(matrix.shape[0], dtype=np.float64)
+    _sparse_cosine_kernel(query.indices, query.data, float(np.sqrt(query.data @ query.data)),
+                          csc.indptr, csc.indices, csc.data, row_norms(matrix), out)
+    np.testing.assert_allclose(out, _reference(matrix, query), rtol=1e-9, atol=1e-12)
+
+@pytest.mark.skipif(_cosine_numba.sparse_cosine is None, reason="numba not installed")
+@pytest.mark.parametrize("norm", ["l2", None])
+def test_query_cosine_matches_sklearn(norm):
+    matrix, query = _tfidf(norm)
+    similarities = query_cosine(query, matrix.tocsc(), row_norms(matrix))
+    np.testing.assert_allclose(similarities, _reference(matrix, query), rtol=1e-9, atol=1e-12)
+
+def test_linear_kernel_fallback_matches_sklearn():
+    # The engine's fallback without numba relies on TF-IDF rows being L2-normalized
+    matrix, query = _tfidf()
+    np.testing.assert_allclose(linear_kernel(query, matrix).ravel(), _reference(matrix, query),
+                               rtol=1e-9, atol=1e-12)
+
+def test_row_norms():
+    matrix, _ = _tfidf(norm=None)
+    np.testing.assert_allclose(row_norms(matrix), np.linalg.norm(matrix.toarray(), axis=1))
+
+def _scoring_inputs():
+    """Sections covering every length bucket, heading level and the score cap"""
+    rng = np.random.default_rng(7)
+    n = 64
+    word_counts = np.concatenate([[0, 99, 100, 1000, 1001, 5000],
+                                  rng.integers(0, 3000, n - 6)]).astype(np.int64)
+    persona_hits = rng.integers(0, 6, n).astype(np.int64)
+    job_hits = rng.integers(0, 9, n).astype(np.int64)
+    persona_hits[0], job_hits[0] = 5, 8  # Full coverage - capped at 1
+    similarities = rng.random(n)
+    level_codes = rng.integers(0, 4, n).astype(np.intp)
+    level_lut = np.array([0.0, 0.1, 0.05, 0.02])
+    return persona_hits, job_hits, 5, 8, similarities, level_codes, level_lut, word_counts
+
+def _expected_scores(persona_hits, job_hits, n_persona, n_job, similarities,
+                     level_codes, level_lut, word_counts) -> np.ndarray:
+    """The scoring formula written out per section"""
+    scores = []
+    for i in range(len(persona_hits)):
+        score = (persona_hits[i] / n_persona * 0.3 + job_hits[i] / n_job * 0.4
+                 + similarities[i] * 0.3 + level_lut[level_codes[i]])
+        if word_counts[i] > 1000:
+            score += 0.02
+        elif word_counts[i] >= 100:
+            score += 0.05
+        scores.append(min(score, 1.0))
+    return np.array(scores)
+
+def test_section_scores_kernel_matches_numpy_fallback(monkeypatch):
+    inputs = _scoring_inputs()
+    kernel_scores = section_scores(*inputs)
+
+    monkeypatch.setattr(_cosine_numba, "section_scores_kernel", None)
+    fallback_scores = section_scores(*inputs)
+
+    np.testing.assert_allclose(kernel_scores, fallback_scores, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(fallback_scores, _expected_scores(*inputs), rtol=0, atol=1e-12)
+    assert fallback_scores.max() == 1.0
+
+def test_python_section_kernel_matches_formula():
+    persona_hits, job_hits, n_persona, n_job, *rest = _scoring_inputs()
+    out = np.empty(persona_hits.shape[0], dtype=np.float64)
+    _section_scores_kernel(persona_hits, job_hits, float(n_persona), float(n_job), *rest, out)
+    np.testing.assert_allclose(out, _expected_scores(persona_hits, job_hits, n_persona, n_job, *rest),
+                               rtol=0, atol=1e-12)
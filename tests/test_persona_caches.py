@@ -0,0 +1,96 @@
+"""
+Document, model and result caches of the persona engine: hits and invalidation
+"""
+
+import pytest
+
+from src import persona_intelligence
+from src.pdf_parser import pdf_digest
+from src.persona_intelligence import PersonaIntelligenceEngine, _remember
+
+SECTIONS = [
+    "Coastal towns offer beaches, water sports and seafood restaurants",
+    "Seafood restaurants in coastal towns serve local wine",
+    "Cooking classes teach local recipes and wine pairing",
+    "Water sports on the beaches include sailing and diving",
+]
+
+def _documents(sections):
+    return [{"filename": "guide.pdf", "sections": [{"content": text} for text in sections]}]
+
+@pytest.fixture
+def engine():
+    return PersonaIntelligenceEngine()
+
+def test_remember_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(persona_intelligence, "_CACHE_SIZE", 2)
+    cache = {}
+    for key in "abc":
+        _remember(cache, key, key.upper())
+    assert cache == {"b": "B", "c": "C"}
+
+def test_model_cache_reuses_fit_for_same_corpus(engine):
+    engine._build_semantic_models(_documents(SECTIONS))
+    vectorizer = engine.tfidf_vectorizer
+
+    engine._build_semantic_models(_documents(list(SECTIONS)))
+    assert engine.tfidf_vectorizer is vectorizer
+    assert len(engine._model_cache) == 1
+
+def test_model_cache_refits_when_content_changes(engine):
+    engine._build_semantic_models(_documents(SECTIONS))
+    vectorizer = engine.tfidf_vectorizer
+
+    engine._build_semantic_models(_documents(SECTIONS[:-1] + ["Sailing and diving trips"]))
+    assert engine.tfidf_vectorizer is not vectorizer
+    assert len(engine._model_cache) == 2
+
+    # Back to the first corpus: its models come from the cache again
+    engine._build_semantic_models(_documents(SECTIONS))
+    assert engine.tfidf_vectorizer is vectorizer
+
+def test_document_cache_skips_reparsing_unchanged_files(engine, tmp_path, monkeypatch):
+    pdf_path = tmp_path / "guide.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 first version")
+    parsed = []
+
+    def parse(pdf_paths):
+        parsed.extend(pdf_paths)
+        return [(path, {"filepath": path, "sections": []}) for path in pdf_paths]
+
+    monkeypatch.setattr(engine, "_parse_documents", parse)
+    paths = [str(pdf_path)]
+
+    engine._extract_all_documents(paths, [pdf_digest(paths[0])])
+    engine._extract_all_documents(paths, [pdf_digest(paths[0])])
+    assert parsed == paths
+
+    # Changed bytes mean a new digest, so the file is parsed again
+    pdf_path.write_bytes(b"%PDF-1.4 second version")
+    documents = engine._extract_all_documents(paths, [pdf_digest(paths[0])])
+    assert parsed == paths * 2
+    assert documents[0]["filepath"] == paths[0]
+
+def test_result_cache_keyed_by_content_and_query(engine, tmp_path, monkeypatch):
+    pdf_path = tmp_path / "guide.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 first version")
+    extractions = []
+
+    def extract(pdf_paths, digests):
+        extractions.append(list(pdf_paths))
+        return _documents(SECTIONS)
+
+    monkeypatch.setattr(engine, "_extract_all_documents", extract)
+    paths = [str(pdf_path)]
+
+    first = engine.analyze_document_collection(paths, "Travel Planner", "Plan a trip")
+    second = engine.analyze_document_collection(paths, "Travel Planner", "Plan a trip")
+    assert len(extractions) == 1
+    assert second["extracted_sections"] == first["extracted_sections"]
+
+    # A different job, or changed file bytes, is a cache miss
+    engine.analyze_document_collection(paths, "Travel Planner", "Book hotels")
+    assert len(extractions) == 2
+    pdf_path.write_bytes(b"%PDF-1.4 second version")
+    engine.analyze_document_collection(paths, "Travel Planner", "Plan a trip")
+    assert len(extractions) == 3